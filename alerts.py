@@ -0,0 +1,145 @@
+"""Asynchronous low-stock alerts.
+
+Request handlers only call ``AlertQueue.enqueue(product_ids)`` after their
+commit. A daemon timer waits ``debounce`` seconds so a burst of sales
+collapses into one check, then runs ``check(product_ids)`` (which
+returns an ``Alert`` for every product that is at or below its ROP) and
+hands each alert to the configured sinks. A product alerts again only
+after it has left the danger zone or ``cooldown`` seconds have passed.
+That cooldown lives in a state object: ``MemoryAlertState`` here is per
+process; the app uses a database-backed one so several workers (and
+restarts) share it and a burst spread across workers alerts once.
+The timer never keeps the process alive; ``flush()`` (registered with
+atexit by the app) runs whatever is still pending on shutdown.
+
+Sinks are plain objects with ``send(alert)``; ``LogSink`` and
+``WebhookSink`` live here, the notifications-table sink lives in app.py
+because it needs the models.
+"""
+import json
+import logging
+import threading
+import time
+import urllib.request
+from collections import namedtuple
+from contextlib import nullcontext
+
+log = logging.getLogger(__name__)
+
+Alert = namedtuple('Alert', ['product_id', 'sku', 'name', 'stock', 'rop', 'eoq', 'action'])
+
+
+def alert_message(alert):
+    return (f"Stok {alert.name} ({alert.sku or '-'}) tinggal {alert.stock}, "
+            f"ROP {alert.rop}: {alert.action}")
+
+
+class LogSink:
+
+    def __init__(self, logger=log):
+        self.logger = logger
+
+    def send(self, alert):
+        self.logger.warning("low stock: %s", alert_message(alert))
+
+
+class WebhookSink:
+    """POSTs each alert as JSON to ``url``; a no-op while url is empty."""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alert):
+        if not self.url:
+            return
+        body = json.dumps({'event': 'low_stock', 'message': alert_message(alert),
+                           **alert._asdict()}).encode('utf-8')
+        req = urllib.request.Request(self.url, data=body, method='POST',
+                                     headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req, timeout=self.timeout):
+            pass
+
+
+class MemoryAlertState:
+    """Per-process cooldown state (single worker, tests)."""
+
+    def __init__(self):
+        self._sent = {}  # product_id -> waktu alert terakhir
+
+    def claim(self, product_id, cooldown):
+        """True if ``product_id`` may alert now (and record that it did)."""
+        now = time.monotonic()
+        last = self._sent.get(product_id)
+        if last is not None and now - last < cooldown:
+            return False
+        self._sent[product_id] = now
+        return True
+
+    def reset(self, product_ids):
+        """Re-arm products that left the danger zone."""
+        for pid in product_ids:
+            self._sent.pop(pid, None)
+
+
+class AlertQueue:
+
+    def __init__(self, check, sinks=(), debounce=5.0, cooldown=3600, context=None, state=None):
+        self.check = check
+        self.sinks = list(sinks)
+        self.debounce = debounce
+        self.cooldown = cooldown
+        self.context = context or nullcontext
+        self.state = state or MemoryAlertState()
+        self._pending = set()
+        self._timer = None
+        self._lock = threading.Lock()
+        self._running = threading.Lock()  # satu cek dalam satu waktu
+
+    def enqueue(self, product_ids):
+        """Queue products whose stock just moved; never blocks on the check."""
+        with self._lock:
+            self._pending.update(product_ids)
+            if self._timer is not None or not self._pending:
+                return None
+            self._timer = threading.Timer(self.debounce, self._run)
+            self._timer.daemon = True
+            self._timer.name = 'alerts'
+            self._timer.start()
+            return self._timer
+
+    def flush(self):
+        """Run the pending check now, in the calling thread."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+        self._run()
+
+    def _run(self):
+        with self._running:
+            with self._lock:
+                self._timer = None
+                product_ids = sorted(self._pending)
+                self._pending.clear()
+            if product_ids:
+                self._check(product_ids)
+
+    def _check(self, product_ids):
+        try:
+            with self.context():
+                alerts = self.check(product_ids)
+                self._dispatch(product_ids, alerts)
+        except Exception:
+            log.exception("cek stok rendah gagal untuk %s", product_ids)
+
+    def _dispatch(self, product_ids, alerts):
+        in_danger = {a.product_id for a in alerts}
+        self.state.reset([pid for pid in product_ids if pid not in in_danger])
+        for alert in alerts:
+            if not self.state.claim(alert.product_id, self.cooldown):
+                continue
+            for sink in self.sinks:
+                try:
+                    sink.send(alert)
+                except Exception:
+                    log.exception("sink %s gagal mengirim alert", type(sink).__name__)
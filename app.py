@@ -1,24 +1,80 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import (Flask, render_template, request, redirect, url_for, flash, session, jsonify, g,
+                   abort, stream_with_context, send_from_directory, has_request_context)
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import func, event
+from flask_sqlalchemy.session import Session as FSASession
+from sqlalchemy import func, event, inspect
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import validates, joinedload
+from sqlalchemy.dialects.mysql import match as mysql_match
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from config import Config
 from config import *
 from datetime import datetime
 from datetime import date, timedelta
-from collections import defaultdict
+from collections import defaultdict, namedtuple
+import atexit
+import csv
+import io
+import json
+import logging
 import math
+import mimetypes
 import os
+import re
+import time
+import click
 from werkzeug.utils import secure_filename
+from planning import check_equivalence, report_rows, STATUS_LABELS, STATUS_KEYS, STATUS_DANGER
+from timebucket import time_bucket, bucket_key, period_start, in_range
+from cache import TTLCache, make_cache
+from scheduler import IntervalScheduler
+from alerts import Alert, AlertQueue, LogSink, WebhookSink, alert_message
+import images
+import assets
+import forecasting
+import instrumentation
+import datagen
+import profiler
 
 app = Flask(__name__)
 app.config.from_object(Config)
 
+logging.basicConfig(level=app.config['LOG_LEVEL'], format=LOG_FORMAT)
+# timing request + hitung query SQL; paling awal supaya hook lain ikut terukur
+instrumentation.init_app(app)
+
 UPLOAD_FOLDER = os.path.join('static', 'uploads', 'products')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-db = SQLAlchemy(app)
+# View yang hanya membaca; SELECT-nya diarahkan ke bind "replica" bila ada
+REPLICA_ENDPOINTS = {'dashboard', 'reports', 'api_products', 'api_reorder', 'category_page'}
+
+class RoutingSession(FSASession):
+    """Session that sends plain SELECTs of read-only views to the replica.
+
+    Writes, flushes, SELECT ... FOR UPDATE and anything outside a
+    REPLICA_ENDPOINTS request keep using the primary database.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing
+                and getattr(clause, 'is_select', False)
+                and getattr(clause, '_for_update_arg', None) is None
+                and has_request_context() and g.get('use_replica')):
+            engine = self._db.engines.get('replica')
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+@app.before_request
+def route_reads_to_replica():
+    g.use_replica = request.endpoint in REPLICA_ENDPOINTS
 
 # -------------------------
 # Models
@@ -28,6 +84,13 @@ class User(db.Model):
     username = db.Column(db.String(64), unique=True, nullable=False)
     password = db.Column(db.String(128), nullable=False)  
     role = db.Column(db.String(32), nullable=False) 
+    # akun hasil sinkron Staff; kunci sinkron role / username / hapus
+    staff_id = db.Column(db.Integer, nullable=True, index=True)
+
+def normalize_category(name):
+    if not name:
+        return None
+    return " ".join(name.split()).lower() or None
 
 class Product(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -38,15 +101,65 @@ class Product(db.Model):
     stock = db.Column(db.Integer, default=0)
     description = db.Column(db.Text, nullable=True)
     image = db.Column(db.String(255), nullable=True)  
+    # Kategori ter-normalisasi (lowercase, spasi dirapikan) untuk filter storefront
+    category_key = db.Column(db.String(64), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_product_category_key_id', 'category_key', 'id'),
+    )
+
+    @validates('category')
+    def _set_category_key(self, key, value):
+        self.category_key = normalize_category(value)
+        return value
 
 def save_image(file):
+    """Store an uploaded product image; resizing happens in the background."""
     if not file:
         return None
 
-    filename = datetime.utcnow().strftime("%Y%m%d%H%M%S") + "_" + file.filename
-    path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(path)
-    return filename
+    return images.store_upload(file, app.config['UPLOAD_FOLDER'])
+
+def product_image_url(filename):
+    return url_for('static', filename='uploads/products/' + filename)
+
+@app.template_global()
+def product_img(image, variant='medium'):
+    """URL of a product image variant (the original until variants exist)."""
+    return product_image_url(images.variant_name(app.config['UPLOAD_FOLDER'], image, variant))
+
+@app.template_global()
+def product_srcset(image, fmt=None):
+    """srcset for a product image; fmt='webp' for the WebP <source>."""
+    return images.srcset(app.config['UPLOAD_FOLDER'], image, product_image_url, fmt)
+
+
+# Manifest hasil `flask assets-build`; kosong = pakai file asli di /static
+asset_manifest = assets.load_manifest(app.static_folder)
+
+@app.template_global()
+def asset_url(filename):
+    """url_for('static', ...) replacement that returns the fingerprinted bundle."""
+    built = asset_manifest.get(filename)
+    if built:
+        return url_for('asset_file', filename=built)
+    return url_for('static', filename=filename)
+
+@app.route('/assets/<path:filename>')
+def asset_file(filename):
+    folder = os.path.join(app.static_folder, assets.DIST)
+    mimetype = mimetypes.guess_type(filename)[0]
+    for encoding, ext in (('br', '.br'), ('gzip', '.gz')):
+        if request.accept_encodings[encoding] and os.path.exists(os.path.join(folder, filename + ext)):
+            resp = send_from_directory(folder, filename + ext, mimetype=mimetype)
+            resp.headers['Content-Encoding'] = encoding
+            break
+    else:
+        resp = send_from_directory(folder, filename, mimetype=mimetype)
+    # nama file berisi hash konten, jadi aman di-cache selamanya
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    return resp
 
 
 class Sale(db.Model):
@@ -54,7 +167,7 @@ class Sale(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'))
     qty = db.Column(db.Integer, nullable=False)
     total = db.Column(db.Float, nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     product = db.relationship('Product')
 
 class Return(db.Model):
@@ -62,7 +175,7 @@ class Return(db.Model):
     product_id = db.Column(db.Integer, db.ForeignKey('product.id'))
     qty = db.Column(db.Integer, nullable=False)
     reason = db.Column(db.String(255))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     product = db.relationship('Product')
 
 class Staff(db.Model):
@@ -73,12 +186,56 @@ class Staff(db.Model):
     phone = db.Column(db.String(50), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class SalesRollup(db.Model):
+    # Agregat penjualan per (produk, bulan), di-update oleh add_sale / add_return
+    __tablename__ = 'sales_monthly'
+    product_id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # "YYYY-MM"
+    qty = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    returned_qty = db.Column(db.Integer, nullable=False, default=0)
+
+class ReorderPlan(db.Model):
+    # Rekomendasi reorder per produk, ditulis oleh refresh_reorder_plan()
+    __tablename__ = 'reorder_plan'
+    product_id = db.Column(db.Integer, primary_key=True)
+    forecast = db.Column(db.Integer, nullable=False, default=0)
+    rop = db.Column(db.Integer, nullable=False, default=0)
+    eoq = db.Column(db.Integer, nullable=False, default=0)
+    stock = db.Column(db.Integer, nullable=False, default=0)  # stok saat dihitung
+    status = db.Column(db.SmallInteger, nullable=False, index=True)  # planning.STATUS_*
+    action = db.Column(db.String(64), nullable=True)
+    model = db.Column(db.String(32), nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class Notification(db.Model):
+    # Notifikasi in-app, mis. alert stok rendah dari low_stock_alerts
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(32), nullable=False)
+    product_id = db.Column(db.Integer, nullable=True)
+    message = db.Column(db.String(255), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    read_at = db.Column(db.DateTime, nullable=True)
+
+class AlertState(db.Model):
+    # Cooldown alert stok rendah per produk, dibagi semua worker
+    __tablename__ = 'alert_state'
+    product_id = db.Column(db.Integer, primary_key=True)
+    sent_at = db.Column(db.DateTime, nullable=False)
+
+class Counter(db.Model):
+    # Counter versi data (mis. "catalog"), dipakai untuk ETag / invalidasi cache
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
 # -------------------------
 # DB init / seed
 # -------------------------
 def init_db():
     os.makedirs(os.path.join(os.path.dirname(__file__), 'instance'), exist_ok=True)
     db.create_all()
+    ensure_search_index()
     # seed users & sample products if not exist
     if not User.query.first():
         db.session.add_all([
@@ -95,15 +252,40 @@ def init_db():
         ]
         db.session.add_all(sample)
         db.session.commit()
+        rebuild_search_index()
+        refresh_reorder_plan()
 
 # -------------------------
 # Helpers
 # -------------------------
+# Snapshot ringan dari User (tanpa password) yang aman disimpan lintas request
+UserIdentity = namedtuple('UserIdentity', ['id', 'username', 'role'])
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
 def current_user():
     uid = session.get('user_id')
     if not uid:
         return None
-    return User.query.get(uid)
+    # memo per request: login_required dan view cukup satu lookup
+    if 'current_user' in g:
+        return g.current_user
+
+    user = user_cache.get(uid)
+    if user is None:
+        row = db.session.get(User, uid)
+        user = UserIdentity(row.id, row.username, row.role) if row else None
+        if user:
+            user_cache.set(uid, user)
+    g.current_user = user
+    return user
+
+def forget_user(uid=None):
+    """Drop cached identities: one user id, or all of them when uid is None."""
+    if uid is None:
+        user_cache.clear()
+    else:
+        user_cache.delete(uid)
+    g.pop('current_user', None)
 
 def login_required(f):
     from functools import wraps
@@ -121,7 +303,8 @@ def is_staff():
     return session.get("role") == "staff"
 
 def is_developer():
-    return session.get("role") == "developer"
+    user = current_user()
+    return user is not None and user.role == "developer"
 
 def exponential_smoothing(data, alpha=0.3):
     if not data:
@@ -153,6 +336,660 @@ def calculate_eoq(annual_demand, order_cost, holding_cost):
         math.sqrt((2 * annual_demand * order_cost) / holding_cost)
     )
 
+def get_counter(name):
+    return db.session.query(Counter.value).filter_by(name=name).scalar() or 0
+
+def increment_row(table, key, deltas):
+    """Atomically add ``deltas`` to the row of ``table`` matching ``key``.
+
+    One upsert statement (``INSERT ... ON DUPLICATE KEY UPDATE`` on MySQL,
+    ``ON CONFLICT DO UPDATE`` on SQLite / PostgreSQL). UPDATE-then-INSERT
+    deadlocks on MySQL when two transactions write the first row of the
+    same key (both take the gap lock, then wait on each other's INSERT).
+    Other dialects fall back to UPDATE, then INSERT in a savepoint.
+    """
+    dialect = db.engine.dialect.name
+    increments = {k: table.c[k] + v for k, v in deltas.items()}
+    if dialect == 'mysql':
+        stmt = mysql_insert(table).values(**key, **deltas).on_duplicate_key_update(increments)
+        db.session.execute(stmt)
+        return
+    if dialect in ('sqlite', 'postgresql'):
+        insert = sqlite_insert if dialect == 'sqlite' else pg_insert
+        stmt = insert(table).values(**key, **deltas).on_conflict_do_update(
+            index_elements=list(key), set_=increments)
+        db.session.execute(stmt)
+        return
+
+    where = [table.c[k] == v for k, v in key.items()]
+    if db.session.execute(table.update().where(*where).values(**increments)).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.execute(table.insert().values(**key, **deltas))
+    except IntegrityError:
+        db.session.execute(table.update().where(*where).values(**increments))
+
+def bump_counter(name):
+    """Increment a version counter inside the current transaction."""
+    increment_row(Counter.__table__, {'name': name}, {'value': 1})
+
+# -------------------------
+# Response cache
+# -------------------------
+# Data dashboard / reports di-cache dengan key yang memuat versi data;
+# setiap tulis (penjualan, retur, produk) menaikkan counter "data", jadi
+# entry lama otomatis tidak terpakai lagi.
+response_cache = make_cache(app.config['RESPONSE_CACHE_URL'],
+                            maxsize=app.config['RESPONSE_CACHE_SIZE'],
+                            ttl=app.config['RESPONSE_CACHE_TTL'])
+
+def data_version():
+    if 'data_version' not in g:
+        g.data_version = get_counter('data')
+    return g.data_version
+
+def bump_data_version():
+    bump_counter('data')
+    g.pop('data_version', None)
+
+def mark_data_changed():
+    """Bump the catalog and data versions after a write has committed.
+
+    Runs as its own short transaction so the shared counter rows are only
+    locked for an instant instead of for the whole sale / product write.
+    """
+    bump_counter('catalog')
+    bump_data_version()
+    db.session.commit()
+
+def cached(name, builder):
+    """Return builder() from the response cache for the current data version."""
+    key = f"{name}:v{data_version()}"
+    value = response_cache.get(key)
+    if value is None:
+        value = builder()
+        response_cache.set(key, value)
+    return value
+
+# -------------------------
+# Product search
+# -------------------------
+# MySQL: FULLTEXT index di product(name, sku, category), dirawat InnoDB.
+# SQLite (dev/test): tabel FTS5 product_fts, rowid = product.id, dirawat
+# oleh index_product() / unindex_product() dari route produk.
+SEARCH_MIN_TOKEN = 3  # innodb_ft_min_token_size default
+product_fts = db.table('product_fts', db.column('rowid'), db.column('name'),
+                       db.column('sku'), db.column('category'), db.column('rank'))
+
+def search_terms(q):
+    return re.findall(r"\w+", (q or "").lower())
+
+def like_escape(term):
+    """``term`` with LIKE wildcards escaped (use with ``escape='\\'``)."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def word_prefix(column, term):
+    """``column`` has a word starting with ``term`` (case-insensitive LIKE)."""
+    t = like_escape(term)
+    return column.ilike(f"{t}%", escape='\\') | column.ilike(f"% {t}%", escape='\\')
+
+def ensure_search_index():
+    """Create the full-text index for the current dialect if it is missing."""
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        indexes = {i['name'] for i in inspect(db.engine).get_indexes('product')}
+        if 'ft_product_search' not in indexes:
+            with db.engine.begin() as conn:
+                conn.exec_driver_sql(
+                    "ALTER TABLE product ADD FULLTEXT INDEX ft_product_search (name, sku, category)"
+                )
+    elif dialect == 'sqlite':
+        with db.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(name, sku, category)"
+            )
+
+def rebuild_search_index():
+    """Refill product_fts from the product table (no-op outside SQLite)."""
+    ensure_search_index()
+    if db.engine.dialect.name != 'sqlite':
+        return
+    db.session.execute(product_fts.delete())
+    db.session.execute(db.text(
+        "INSERT INTO product_fts (rowid, name, sku, category) "
+        "SELECT id, name, sku, category FROM product"
+    ))
+    db.session.commit()
+
+def index_product(p):
+    if db.engine.dialect.name != 'sqlite':
+        return
+    unindex_product(p.id)
+    db.session.execute(product_fts.insert().values(
+        rowid=p.id, name=p.name, sku=p.sku, category=p.category))
+
+def unindex_product(product_id):
+    if db.engine.dialect.name != 'sqlite':
+        return
+    db.session.execute(product_fts.delete().where(product_fts.c.rowid == product_id))
+
+def apply_search(query, q):
+    """Filter ``query`` (over Product) by a ranked prefix search of ``q``.
+
+    Every term must match a word prefix in name, sku or category; results
+    come back best match first. Returns the query unchanged when ``q`` has
+    no searchable terms.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return query
+
+    dialect = db.engine.dialect.name
+    if dialect == 'mysql':
+        long_terms = [t for t in terms if len(t) >= SEARCH_MIN_TOKEN]
+        # token pendek tidak masuk FULLTEXT index, cocokkan sebagai prefix kata
+        # di kolom yang sama dengan index-nya (name, sku, category)
+        for t in terms:
+            if len(t) < SEARCH_MIN_TOKEN:
+                query = query.filter(
+                    word_prefix(Product.name, t) | word_prefix(Product.sku, t) |
+                    word_prefix(Product.category, t)
+                )
+        if long_terms:
+            score = mysql_match(Product.name, Product.sku, Product.category,
+                                against=" ".join(f"+{t}*" for t in long_terms)).in_boolean_mode()
+            query = query.filter(score > 0).order_by(score.desc())
+        return query
+
+    if dialect == 'sqlite':
+        fts_query = " AND ".join(f'"{t}"*' for t in terms)
+        hits = (
+            db.select(product_fts.c.rowid, product_fts.c.rank)
+            .where(db.literal_column('product_fts').op('MATCH')(fts_query))
+            .subquery()
+        )
+        return query.join(hits, hits.c.rowid == Product.id).order_by(hits.c.rank)
+
+    for t in terms:
+        pattern = f"%{like_escape(t)}%"
+        query = query.filter(
+            Product.name.ilike(pattern, escape='\\') | Product.sku.ilike(pattern, escape='\\') |
+            Product.category.ilike(pattern, escape='\\')
+        )
+    return query
+
+# -------------------------
+# Sales rollup
+# -------------------------
+def bump_sales_rollup(product_id, when, qty=0, revenue=0.0, orders=0, returned_qty=0):
+    """Add deltas to the (product, month) rollup row in the current session.
+
+    The caller commits, so the rollup lands in the same transaction as the
+    Sale / Return row it mirrors.
+    """
+    month = bucket_key(when or datetime.utcnow(), 'month')
+    increment_row(
+        SalesRollup.__table__,
+        {'product_id': product_id, 'month': month},
+        {'qty': qty, 'revenue': revenue, 'orders': orders, 'returned_qty': returned_qty}
+    )
+
+def rebuild_sales_rollup():
+    """Recompute sales_monthly from scratch out of the sale and return tables."""
+    sale_rows = (
+        db.session.query(
+            Sale.product_id,
+            time_bucket('month', Sale.created_at).label("month"),
+            func.sum(Sale.qty),
+            func.sum(Sale.total),
+            func.count(Sale.id)
+        )
+        .filter(Sale.product_id.isnot(None), Sale.created_at.isnot(None))
+        .group_by(Sale.product_id, "month")
+        .all()
+    )
+    return_rows = (
+        db.session.query(
+            Return.product_id,
+            time_bucket('month', Return.created_at).label("month"),
+            func.sum(Return.qty)
+        )
+        .filter(Return.product_id.isnot(None), Return.created_at.isnot(None))
+        .group_by(Return.product_id, "month")
+        .all()
+    )
+
+    rows = {}
+    for pid, month, qty, revenue, orders in sale_rows:
+        rows[(pid, month)] = {
+            'product_id': pid, 'month': month, 'qty': int(qty or 0),
+            'revenue': float(revenue or 0), 'orders': int(orders or 0),
+            'returned_qty': 0
+        }
+    for pid, month, qty in return_rows:
+        row = rows.setdefault((pid, month), {
+            'product_id': pid, 'month': month, 'qty': 0,
+            'revenue': 0.0, 'orders': 0, 'returned_qty': 0
+        })
+        row['returned_qty'] = int(qty or 0)
+
+    db.session.query(SalesRollup).delete()
+    if rows:
+        db.session.execute(SalesRollup.__table__.insert(), list(rows.values()))
+    db.session.commit()
+    refresh_reorder_plan()
+    mark_data_changed()
+    return len(rows)
+
+# -------------------------
+# Stock movement
+# -------------------------
+def take_stock(product_id, qty):
+    """Atomically take ``qty`` off a product's stock.
+
+    Single conditional UPDATE, so concurrent cashiers can neither oversell
+    nor lose each other's decrements. Returns False when stock is short.
+    """
+    table = Product.__table__
+    result = db.session.execute(
+        table.update()
+        .where(table.c.id == product_id, table.c.stock >= qty)
+        .values(stock=table.c.stock - qty)
+    )
+    return result.rowcount == 1
+
+def put_back_stock(product_id, qty):
+    """Atomically add ``qty`` back to stock. Returns False if no such product."""
+    table = Product.__table__
+    result = db.session.execute(
+        table.update()
+        .where(table.c.id == product_id)
+        .values(stock=func.coalesce(table.c.stock, 0) + qty)
+    )
+    return result.rowcount == 1
+
+def record_sale(product_id, qty, created_at, price):
+    """Take stock and insert a Sale (+ rollup) in the current transaction.
+
+    Returns the new Sale, or None when there is not enough stock. The
+    caller commits.
+    """
+    if not take_stock(product_id, qty):
+        return None
+    total = price * qty
+    sale = Sale(product_id=product_id, qty=qty, total=total, created_at=created_at)
+    db.session.add(sale)
+    bump_sales_rollup(product_id, created_at, qty=qty, revenue=total, orders=1)
+    return sale
+
+# -------------------------
+# Reorder plan
+# -------------------------
+# Forecast, ROP, EOQ, status & aksi per produk disimpan di reorder_plan
+# supaya /reports, dashboard dan /api/reorder cukup membaca tabel. Dihitung
+# ulang untuk produk yang stok / penjualannya berubah, dan penuh lewat
+# `flask reorder-refresh` (cron) atau scheduler in-process.
+REFRESH_CHUNK = 1000
+
+def last_full_month():
+    """'YYYY-MM' of the last complete month; forecasts end there.
+
+    Bulan berjalan belum lengkap: kalau ikut dihitung (zero-filled), forecast
+    turun di awal bulan dan ROP/EOQ bergeser tiap hari.
+    """
+    return bucket_key(period_start('month', 1), 'month')
+
+def plan_reorder(product_ids=None):
+    """Report rows (with product_id) for every product, or just ``product_ids``."""
+    products = db.session.query(
+        Product.id, Product.name, Product.sku, Product.price, Product.stock
+    ).order_by(Product.id)
+    demand = (
+        db.session.query(SalesRollup.product_id, SalesRollup.month, SalesRollup.qty)
+        .filter(SalesRollup.orders > 0)
+    )
+    if product_ids is not None:
+        products = products.filter(Product.id.in_(product_ids))
+        demand = demand.filter(SalesRollup.product_id.in_(product_ids))
+    products = products.all()
+
+    matrix, lengths = forecasting.series_matrix([p.id for p in products], demand, last_full_month())
+    forecast, models, _ = forecasting.select_models(matrix, lengths,
+                                                    holdout=FORECAST_HOLDOUT_MONTHS)
+    rows = report_rows(products, forecast, lengths > 0, models)
+    for p, row in zip(products, rows):
+        row['product_id'] = p.id
+    return rows
+
+def refresh_reorder_plan(product_ids=None):
+    """Recompute reorder_plan for ``product_ids`` (all products when None) and commit.
+
+    Returns the fresh report rows.
+    """
+    if product_ids is not None:
+        product_ids = sorted(set(product_ids))
+        chunks = [product_ids[i:i + REFRESH_CHUNK] for i in range(0, len(product_ids), REFRESH_CHUNK)]
+    else:
+        chunks = [None]
+
+    now = datetime.utcnow()
+    fresh = []
+    for chunk in chunks:
+        rows = plan_reorder(chunk)
+        if chunk is None:
+            db.session.query(ReorderPlan).delete()
+        else:
+            db.session.query(ReorderPlan).filter(ReorderPlan.product_id.in_(chunk))\
+                .delete(synchronize_session=False)
+        if rows:
+            db.session.execute(ReorderPlan.__table__.insert(), [
+                {'product_id': r['product_id'], 'forecast': r['forecast'], 'rop': r['rop'],
+                 'eoq': r['eoq'], 'stock': r['stock'] or 0, 'status': r['status_code'],
+                 'action': r['action'], 'model': r['model'], 'updated_at': now}
+                for r in rows
+            ])
+        fresh.extend(rows)
+    db.session.commit()
+    return fresh
+
+def reorder_report_row(row):
+    """Inventory report row (same shape as planning.report_rows) from a
+    product + reorder_plan result row."""
+    label, _, status_class = STATUS_LABELS[row.status]
+    return {
+        'name': row.name,
+        'sku': row.sku,
+        'price': row.price,
+        'stock': row.stock,
+        'forecast': row.forecast,
+        'rop': row.rop,
+        'eoq': row.eoq,
+        'status': label,
+        'status_code': row.status,
+        'action': row.action,
+        'status_class': status_class,
+        'model': row.model,
+    }
+
+reorder_scheduler = IntervalScheduler()
+
+def scheduled_reorder_refresh():
+    with app.app_context():
+        refresh_reorder_plan()
+        bump_data_version()
+        db.session.commit()
+
+@app.before_request
+def start_reorder_scheduler():
+    seconds = app.config['REORDER_REFRESH_SECONDS']
+    if seconds > 0:
+        reorder_scheduler.add_job('reorder_plan', seconds, scheduled_reorder_refresh)
+
+# Alert stok rendah: setelah commit yang menggerakkan stok, produk masuk
+# antrean; worker me-refresh reorder_plan-nya lalu kirim alert bila stok
+# <= ROP. Request tidak pernah menunggu.
+class NotificationSink:
+    """Alert sink writing to the notification table (inside the worker's app context)."""
+
+    def send(self, alert):
+        db.session.add(Notification(kind='low_stock', product_id=alert.product_id,
+                                    message=alert_message(alert)))
+        db.session.commit()
+
+class DbAlertState:
+    """Alert cooldown in the alert_state table, shared by every worker.
+
+    A claim is an INSERT (first alert of a product) or a conditional UPDATE
+    (cooldown over); only one worker's statement can win for a product, so
+    a burst spread across workers alerts once and a restart keeps the
+    cooldown. Each claim commits before the sinks run.
+    """
+
+    def claim(self, product_id, cooldown):
+        now = datetime.utcnow()
+        table = AlertState.__table__
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert().values(product_id=product_id, sent_at=now))
+            claimed = True
+        except IntegrityError:
+            claimed = db.session.execute(
+                table.update()
+                .where(table.c.product_id == product_id,
+                       table.c.sent_at <= now - timedelta(seconds=cooldown))
+                .values(sent_at=now)
+            ).rowcount == 1
+        db.session.commit()
+        return claimed
+
+    def reset(self, product_ids):
+        if not product_ids:
+            return
+        db.session.query(AlertState).filter(AlertState.product_id.in_(product_ids))\
+            .delete(synchronize_session=False)
+        db.session.commit()
+
+def check_low_stock(product_ids):
+    """Refresh the plan of ``product_ids``; alerts for those at or below ROP."""
+    rows = refresh_reorder_plan(product_ids)
+    # hanya stok/plan yang berubah: katalog storefront & ETag tetap valid
+    bump_data_version()
+    db.session.commit()
+    return [
+        Alert(r['product_id'], r['sku'], r['name'], r['stock'], r['rop'], r['eoq'], r['action'])
+        for r in rows if r['status_code'] == STATUS_DANGER
+    ]
+
+low_stock_alerts = AlertQueue(
+    check_low_stock,
+    sinks=[LogSink(), NotificationSink(), WebhookSink(app.config['ALERT_WEBHOOK_URL'])],
+    debounce=app.config['ALERT_DEBOUNCE_SECONDS'],
+    cooldown=app.config['ALERT_COOLDOWN_SECONDS'],
+    context=app.app_context,
+    state=DbAlertState(),
+)
+atexit.register(low_stock_alerts.flush)
+
+def stock_moved(product_ids):
+    """Call after committing a stock change: re-plan and alert in the background."""
+    low_stock_alerts.enqueue(product_ids)
+
+# -------------------------
+# Bulk sales import
+# -------------------------
+SALE_DATETIME_FORMATS = ("%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M", "%d/%m/%Y %H:%M", "%Y-%m-%d")
+BULK_CHUNK = 5000
+
+def parse_sale_datetime(value):
+    if value is None or value == '':
+        return datetime.utcnow()
+    if not isinstance(value, str):
+        raise ValueError(f"created_at harus teks tanggal (mis. 2025-01-31 10:00), bukan {value!r}")
+    value = value.strip()
+    if not value:
+        return datetime.utcnow()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in SALE_DATETIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"format tanggal tidak dikenal: {value}")
+
+def parse_whole_number(value, field):
+    """``value`` (int or numeric text) as int; 1.7 is rejected, not truncated to 1."""
+    number = value
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            pass
+        try:
+            number = float(value)
+        except ValueError:
+            number = None
+    if isinstance(number, float) and number.is_integer():
+        return int(number)
+    if isinstance(number, int) and not isinstance(number, bool):
+        return number
+    raise ValueError(f"{field} harus bilangan bulat: {value!r}")
+
+def read_csv_rows(stream):
+    """Rows of a CSV file with a header line, as dicts."""
+    return list(csv.DictReader(stream))
+
+def bulk_lines_from_request(key):
+    """Lines of a bulk import request: JSON list / {key: [...]}, text/csv or a CSV upload.
+
+    Returns None when the body is not in a supported format.
+    """
+    upload = request.files.get('file')
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        lines = payload.get(key) if isinstance(payload, dict) else payload
+        return lines if isinstance(lines, list) else None
+    if upload:
+        return read_csv_rows(io.TextIOWrapper(upload.stream, encoding='utf-8-sig'))
+    if request.mimetype == 'text/csv':
+        return read_csv_rows(io.StringIO(request.get_data(as_text=True)))
+    return None
+
+def bulk_lines_from_file(path, key):
+    """Lines of a CSV file, or of a JSON file holding a list / {key: [...]} (CLI imports)."""
+    with open(path, encoding='utf-8-sig') as f:
+        if not path.lower().endswith('.json'):
+            return read_csv_rows(f)
+        try:
+            payload = json.load(f)
+        except ValueError as e:
+            raise click.UsageError(f"{path}: JSON tidak valid ({e})")
+    lines = payload.get(key) if isinstance(payload, dict) else payload
+    if not isinstance(lines, list):
+        raise click.UsageError(f"{path}: JSON harus berupa list atau {{\"{key}\": [...]}}")
+    return lines
+
+def print_import_errors(errors, limit=50):
+    for e in errors[:limit]:
+        print(f"baris {e['line']}: {e['error']}")
+    if len(errors) > limit:
+        print(f"... dan {len(errors) - limit} error lainnya")
+
+def ingest_sales(lines, strict=False):
+    """Validate and insert a batch of sales in one transaction.
+
+    ``lines`` are dicts with ``product_id`` (or ``sku``), ``qty`` and an
+    optional ``created_at``. Stock of every affected product is locked once,
+    allocated line by line in input order, decremented with one conditional
+    UPDATE per product, and the Sale rows go in with executemany. Lines that
+    fail validation or run out of stock are reported in ``errors`` (1-based
+    line numbers); with ``strict`` any error rolls back the whole batch.
+    If a concurrent sale took the stock after it was allocated (FOR UPDATE
+    is a no-op on SQLite), the whole batch is rolled back and the lines of
+    those products are reported.
+
+    Returns ``(inserted, errors)``.
+    """
+    errors = []
+    parsed = []
+    skus = set()
+    for n, line in enumerate(lines, start=1):
+        try:
+            if not isinstance(line, dict):
+                raise ValueError("baris harus berupa object / baris CSV")
+            sku = str(line.get('sku') or '').strip() or None
+            raw_pid = line.get('product_id')
+            pid = parse_whole_number(raw_pid, 'product_id') if raw_pid not in (None, '') else None
+            if pid is None and sku is None:
+                raise ValueError("product_id atau sku wajib diisi")
+            raw_qty = line.get('qty')
+            qty = parse_whole_number(raw_qty, 'qty') if raw_qty not in (None, '') else 1
+            if qty < 1:
+                raise ValueError("qty minimal 1")
+            created_at = parse_sale_datetime(line.get('created_at'))
+        except (TypeError, ValueError, AttributeError) as e:
+            errors.append({'line': n, 'error': str(e)})
+            continue
+        if pid is None:
+            skus.add(sku)
+        parsed.append((n, pid, sku, qty, created_at))
+
+    sku_ids = {}
+    skus = list(skus)
+    for i in range(0, len(skus), BULK_CHUNK):
+        chunk = skus[i:i + BULK_CHUNK]
+        sku_ids.update(db.session.query(Product.sku, Product.id).filter(Product.sku.in_(chunk)).all())
+
+    product_ids = sorted({pid if pid is not None else sku_ids.get(sku)
+                          for _, pid, sku, _, _ in parsed} - {None})
+    # kunci baris produk (urut id, hindari deadlock) lalu alokasi stok di memori
+    products = {}
+    for i in range(0, len(product_ids), BULK_CHUNK):
+        chunk = product_ids[i:i + BULK_CHUNK]
+        rows = (
+            db.session.query(Product.id, Product.price, Product.stock)
+            .filter(Product.id.in_(chunk))
+            .order_by(Product.id)
+            .with_for_update()
+            .all()
+        )
+        products.update({pid: [price, stock or 0] for pid, price, stock in rows})
+
+    taken = defaultdict(int)
+    taken_lines = defaultdict(list)
+    rollup = defaultdict(lambda: [0, 0.0, 0])
+    sale_rows = []
+    for n, pid, sku, qty, created_at in parsed:
+        if pid is None:
+            pid = sku_ids.get(sku)
+        product = products.get(pid)
+        if product is None:
+            errors.append({'line': n, 'error': f"produk tidak ditemukan: {pid or sku}"})
+            continue
+        price, stock = product
+        if stock < qty:
+            errors.append({'line': n, 'error': f"stok tidak cukup (sisa {stock})"})
+            continue
+        product[1] -= qty
+        taken[pid] += qty
+        taken_lines[pid].append(n)
+        total = price * qty
+        sale_rows.append({'product_id': pid, 'qty': qty, 'total': total, 'created_at': created_at})
+        agg = rollup[(pid, bucket_key(created_at, 'month'))]
+        agg[0] += qty
+        agg[1] += total
+        agg[2] += 1
+
+    errors.sort(key=lambda e: e['line'])
+    if (strict and errors) or not sale_rows:
+        db.session.rollback()
+        return 0, errors
+
+    # satu UPDATE per produk supaya rowcount terbaca (executemany tidak
+    # menjamin rowcount per baris di semua driver)
+    conflicts = [pid for pid, qty in taken.items() if not take_stock(pid, qty)]
+    if conflicts:
+        db.session.rollback()
+        errors.extend({'line': n, 'error': "stok berubah saat import, batch dibatalkan"}
+                      for pid in conflicts for n in taken_lines[pid])
+        errors.sort(key=lambda e: e['line'])
+        return 0, errors
+    for i in range(0, len(sale_rows), BULK_CHUNK):
+        db.session.execute(Sale.__table__.insert(), sale_rows[i:i + BULK_CHUNK])
+    for (pid, month), (qty, revenue, orders) in rollup.items():
+        increment_row(
+            SalesRollup.__table__,
+            {'product_id': pid, 'month': month},
+            {'qty': qty, 'revenue': revenue, 'orders': orders, 'returned_qty': 0}
+        )
+    db.session.commit()
+    mark_data_changed()
+    stock_moved(taken.keys())
+    return len(sale_rows), errors
+
 # -------------------------
 # Routes
 # -------------------------
@@ -186,21 +1023,42 @@ def search():
     return redirect(url_for("category_page", category_name="Semua", q=q))
 
 CATEGORIES = ["Semua", "New Arrival", "Aksesoris", "Half Face", "Wanita", "Full Face"]
+
+def storefront_query(category_name, q=""):
+    """Products for a storefront category, filtered and ordered in SQL."""
+    query = Product.query
+    key = normalize_category(category_name)
+    if key and key != "semua":
+        query = query.filter(Product.category_key == key)
+    return apply_search(query, q).order_by(Product.id)
+
 @app.route('/category/<category_name>')
 def category_page(category_name):
-    q = request.args.get("q", "").lower()
-
-    # Ambil produk berdasarkan kategori
-    if category_name.lower() == "semua":
-        products = Product.query.all()
+    q = request.args.get("q", "").strip().lower()
+    after = request.args.get("after", 0, type=int)
+    page = max(request.args.get("page", 1, type=int), 1)
+
+    query = storefront_query(category_name, q)
+    if search_terms(q):
+        # hasil search diurutkan relevansi, jadi paging pakai offset
+        query = query.offset((page - 1) * STOREFRONT_PAGE_SIZE)
     else:
-        products = Product.query.filter(
-            db.func.lower(Product.category) == category_name.lower()
-        ).all()
-
-    # Filter hasil search
-    if q:
-        products = [p for p in products if q in p.name.lower()]
+        # browse kategori: keyset di id
+        query = query.filter(Product.id > after)
+    products = query.limit(STOREFRONT_PAGE_SIZE + 1).all()
+
+    has_more = len(products) > STOREFRONT_PAGE_SIZE
+    products = products[:STOREFRONT_PAGE_SIZE]
+
+    next_url = None
+    first_url = None
+    if has_more:
+        if search_terms(q):
+            next_url = url_for('category_page', category_name=category_name, q=q, page=page + 1)
+        else:
+            next_url = url_for('category_page', category_name=category_name, after=products[-1].id)
+    if after or page > 1:
+        first_url = url_for('category_page', category_name=category_name, q=q or None)
 
     return render_template(
         "landing/category.html",
@@ -208,7 +1066,9 @@ def category_page(category_name):
         categories=CATEGORIES,
         products=products,
         active_page="category_page",
-        q=q
+        q=q,
+        next_url=next_url,
+        first_url=first_url
     )
 
 @app.route('/login', methods=['GET','POST'])
@@ -235,28 +1095,26 @@ def login():
 
 @app.route('/logout')
 def logout():
-    session.pop('user_id', None)
+    uid = session.pop('user_id', None)
+    if uid:
+        forget_user(uid)
     flash('Logged out', 'info')
     return redirect(url_for('login'))
 
-@app.route('/dashboard')
-@login_required
-def dashboard():
-    user = current_user()  
-
-    product_preview = Product.query.order_by(Product.id.desc()).limit(6).all()
+def dashboard_stats():
+    """KPI block and monthly chart data of the dashboard (cacheable)."""
     total_products = Product.query.count()
     total_stock = db.session.query(db.func.sum(Product.stock)).scalar() or 0
-    recent_sales = Sale.query.order_by(Sale.created_at.desc()).limit(5).all()
 
-    # === BULANAN ===
+    # === BULANAN === (dari rollup, biaya sebanding jumlah bulan)
     monthly = (
         db.session.query(
-            func.date_format(Sale.created_at, "%Y-%m").label("month"),
-            func.sum(Sale.total).label("revenue")
+            SalesRollup.month,
+            func.sum(SalesRollup.revenue).label("revenue"),
+            func.sum(SalesRollup.orders).label("orders")
         )
-        .group_by("month")
-        .order_by("month")
+        .group_by(SalesRollup.month)
+        .order_by(SalesRollup.month)
         .all()
     )
 
@@ -271,24 +1129,64 @@ def dashboard():
     months = [nama_bulan_indo.get(m[0][5:7], m[0]) for m in monthly]
     revenue = [m[1] for m in monthly]
 
-    total_sales = db.session.query(db.func.sum(Sale.total)).scalar() or 0
-    total_orders = db.session.query(db.func.count(Sale.id)).scalar() or 0
-    net_profit = total_sales * 0.2
+    total_sales = sum(m[1] or 0 for m in monthly)
+    total_orders = sum(m[2] or 0 for m in monthly)
+
+    # Produk yang harus di-order (status Bahaya di reorder_plan)
+    reorder_count = ReorderPlan.query.filter_by(status=STATUS_DANGER).count()
+    reorder_items = [
+        tuple(r) for r in db.session.query(Product.name, Product.stock, ReorderPlan.rop,
+                                           ReorderPlan.action)
+        .join(ReorderPlan, ReorderPlan.product_id == Product.id)
+        .filter(ReorderPlan.status == STATUS_DANGER)
+        .order_by(Product.stock, Product.id)
+        .limit(DASHBOARD_REORDER_ITEMS)
+    ]
+
+    return {
+        'total_products': total_products,
+        'total_stock': total_stock,
+        'total_sales': total_sales,
+        'total_orders': total_orders,
+        'net_profit': total_sales * 0.2,
+        'months': months,
+        'revenue': revenue,
+        'reorder_count': reorder_count,
+        'reorder_items': reorder_items,
+    }
+
+@app.route('/dashboard')
+@login_required
+def dashboard():
+    user = current_user()  
+
+    product_preview = Product.query.order_by(Product.id.desc()).limit(6).all()
+    recent_sales = (
+        Sale.query.options(joinedload(Sale.product))
+        .order_by(Sale.created_at.desc(), Sale.id.desc())
+        .limit(5)
+        .all()
+    )
+
+    # KPI & data chart bulanan (di-cache sampai data berubah)
+    stats = cached('dashboard_stats', dashboard_stats)
 
     return render_template(
         "system/dashboard.html",
         user=user,
         role=user.role,             
         products=product_preview,
-        total_products=total_products,
-        total_stock=total_stock,
+        total_products=stats['total_products'],
+        total_stock=stats['total_stock'],
         recent_sales=recent_sales,
-        total_sales=total_sales,
-        total_orders=total_orders,
-        net_profit=net_profit,
+        total_sales=stats['total_sales'],
+        total_orders=stats['total_orders'],
+        net_profit=stats['net_profit'],
+        reorder_count=stats['reorder_count'],
+        reorder_items=stats['reorder_items'],
         dashboard_data={
-            "months": months,
-            "revenue": revenue
+            "months": stats['months'],
+            "revenue": stats['revenue']
         },
         title="Dashboard"
     )
@@ -302,12 +1200,8 @@ def products():
     q = request.args.get("search", "").strip()
 
     if q:
-        # filter berdasarkan nama, sku, atau kategori (opsional)
-        items = Product.query.filter(
-            (Product.name.ilike(f"%{q}%")) |
-            (Product.sku.ilike(f"%{q}%")) |
-            (Product.category.ilike(f"%{q}%"))
-        ).order_by(Product.name).all()
+        # full-text search di nama, sku, atau kategori (urut relevansi)
+        items = apply_search(Product.query, q).order_by(Product.name).all()
     else:
         items = Product.query.order_by(Product.name).all()
 
@@ -343,10 +1237,7 @@ def add_product():
     image_filename = None
 
     if image_file and allowed(image_file.filename):
-        filename = secure_filename(image_file.filename)
-        image_path = os.path.join(UPLOAD_FOLDER, filename)
-        image_file.save(image_path)
-        image_filename = filename
+        image_filename = save_image(image_file)
 
     p = Product(
         name=name,
@@ -359,7 +1250,11 @@ def add_product():
     )
 
     db.session.add(p)
+    db.session.flush()
+    index_product(p)
     db.session.commit()
+    refresh_reorder_plan([p.id])
+    mark_data_changed()
 
     flash('Product added', 'success')
     return redirect(url_for('products'))
@@ -387,12 +1282,12 @@ def update_product(id):
 
     image_file = request.files.get('image')
     if image_file and allowed(image_file.filename):
-        filename = secure_filename(image_file.filename)
-        image_path = os.path.join(UPLOAD_FOLDER, filename)
-        image_file.save(image_path)
-        p.image = filename
+        p.image = save_image(image_file)
 
+    index_product(p)
     db.session.commit()
+    mark_data_changed()
+    stock_moved([p.id])
     flash('Product updated', 'success')
     return redirect(url_for('products'))
 
@@ -401,21 +1296,60 @@ def update_product(id):
 def delete_product(id):
     p = Product.query.get_or_404(id)
     db.session.delete(p)
+    unindex_product(id)
+    db.session.query(ReorderPlan).filter_by(product_id=id).delete()
     db.session.commit()
+    mark_data_changed()
     flash('Product deleted', 'warning')
     return redirect(url_for('products'))
 
 # Sales
+def history_page(model):
+    """One page of Sale / Return history, newest first, with its product.
+
+    Keyset-paged on (created_at, id) via ``?before=<iso>&before_id=<id>``,
+    so every page costs the same single query however deep it is. Returns
+    (rows, next_url, first_url).
+    """
+    query = (
+        model.query
+        .options(joinedload(model.product))
+        .order_by(model.created_at.desc(), model.id.desc())
+    )
+    before = request.args.get('before')
+    before_id = request.args.get('before_id', type=int)
+    if before and before_id:
+        try:
+            before_at = datetime.fromisoformat(before)
+        except ValueError:
+            abort(400)
+        query = query.filter(db.or_(
+            model.created_at < before_at,
+            db.and_(model.created_at == before_at, model.id < before_id)
+        ))
+    rows = query.limit(HISTORY_PAGE_SIZE + 1).all()
+
+    has_more = len(rows) > HISTORY_PAGE_SIZE
+    rows = rows[:HISTORY_PAGE_SIZE]
+    next_url = None
+    if has_more and rows[-1].created_at is not None:
+        next_url = url_for(request.endpoint, before=rows[-1].created_at.isoformat(),
+                           before_id=rows[-1].id)
+    first_url = url_for(request.endpoint) if before else None
+    return rows, next_url, first_url
+
 @app.route('/sales')
 @login_required
 def sales():
     user = current_user()
     items = Product.query.order_by(Product.name).all()
-    sales = Sale.query.order_by(Sale.created_at.desc()).limit(50).all()
+    sales, next_url, first_url = history_page(Sale)
     return render_template(
         'system/sales.html', 
         products=items, 
         sales=sales,
+        next_url=next_url,
+        first_url=first_url,
         user=user,
         role=user.role, 
         title="Data Penjualan")
@@ -433,35 +1367,57 @@ def add_sale():
     # PARSE datetime-local input → format: "2025-03-01T14:30"
     created_at = datetime.strptime(created_str, "%Y-%m-%dT%H:%M")
 
-    p = Product.query.get_or_404(pid)
+    if qty < 1:
+        flash('Qty minimal 1', 'danger')
+        return redirect(url_for('sales'))
 
-    if p.stock < qty:
+    price = db.session.query(Product.price).filter_by(id=pid).scalar()
+    if price is None:
+        abort(404)
+
+    if record_sale(pid, qty, created_at, price) is None:
+        db.session.rollback()
         flash('Not enough stock', 'danger')
         return redirect(url_for('sales'))
 
-    total = p.price * qty
-    p.stock -= qty
-
-    sale = Sale(product_id=pid, qty=qty, total=total, created_at=created_at)
-    db.session.add(sale)
     db.session.commit()
+    mark_data_changed()
+    stock_moved([pid])
 
     flash('Sale recorded', 'success')
     return redirect(url_for('sales'))
 
 
+@app.route('/sales/bulk', methods=['POST'])
+@login_required
+def bulk_sales():
+    if is_owner():
+        return jsonify(error="Owner tidak bisa input penjualan"), 403
+
+    lines = bulk_lines_from_request('sales')
+    if lines is None:
+        return jsonify(error="Kirim JSON (list / {\"sales\": [...]}), text/csv, atau file CSV"), 415
+
+    strict = request.args.get('strict') in ('1', 'true')
+    inserted, errors = ingest_sales(lines, strict=strict)
+    status = 422 if errors and (strict or not inserted) else 200
+    return jsonify(inserted=inserted, errors=errors), status
+
+
 # Returns
 @app.route('/returns')
 @login_required
 def returns():
     user = current_user()
-    items = Return.query.order_by(Return.created_at.desc()).limit(50).all()
+    items, next_url, first_url = history_page(Return)
     products = Product.query.order_by(Product.name).all()
     return render_template(
         'system/returns.html',
         user=user,
         role=user.role, 
         returns=items, 
+        next_url=next_url,
+        first_url=first_url,
         products=products, 
         title="Data Retur")
 
@@ -474,166 +1430,211 @@ def add_return():
     pid = int(request.form.get('product_id'))
     qty = int(request.form.get('qty') or 1)
     reason = request.form.get('reason')
-    p = Product.query.get_or_404(pid)
+    if qty < 1:
+        flash('Qty minimal 1', 'danger')
+        return redirect(url_for('returns'))
     # for demo, returns add back to stock
-    p.stock += qty
-    r = Return(product_id=pid, qty=qty, reason=reason)
+    if not put_back_stock(pid, qty):
+        abort(404)
+    r = Return(product_id=pid, qty=qty, reason=reason, created_at=datetime.utcnow())
     db.session.add(r)
+    bump_sales_rollup(pid, r.created_at, returned_qty=qty)
     db.session.commit()
+    mark_data_changed()
+    stock_moved([pid])
     flash('Return recorded', 'info')
     return redirect(url_for('returns'))
 
 # Reports
-@app.route('/reports')
-@login_required
-def reports():
-    user = current_user()
+def load_inventory_report():
+    """Inventory rows of every product, read from reorder_plan.
 
-    # 1. PERSIAPAN DATA (STOK)
-    products = Product.query.all()
-    
-    # Ambil history penjualan untuk Forecast
-    sales_query = (
+    Products that were never planned (e.g. the table was just created)
+    are planned on the spot.
+    """
+    rows = (
         db.session.query(
-            Sale.product_id,
-            func.date_format(Sale.created_at, '%Y-%m').label('month'),
-            func.sum(Sale.qty)
+            Product.id, Product.name, Product.sku, Product.price, Product.stock,
+            ReorderPlan.forecast, ReorderPlan.rop, ReorderPlan.eoq, ReorderPlan.status,
+            ReorderPlan.action, ReorderPlan.model
         )
-        .group_by(Sale.product_id, 'month')
-        .order_by('month')
+        .outerjoin(ReorderPlan, ReorderPlan.product_id == Product.id)
+        .order_by(Product.id)
         .all()
     )
-
-    product_sales_history = defaultdict(list)
-    for pid, month, total_qty in sales_query:
-        product_sales_history[pid].append(float(total_qty or 0))
-
     inventory_report = []
-
-    # 2. LOOPING PER PRODUK
-    for p in products:
-        qty_history = product_sales_history.get(p.id, [])
-        
-        # --- FORECAST ---
-        next_forecast = 0
-        has_data = False 
-        
-        if len(qty_history) >= 2:
-            ses = exponential_smoothing(qty_history, alpha=0.3)
-            next_forecast = math.ceil(ses[-1])
-            has_data = True
-        elif len(qty_history) == 1:
-            next_forecast = math.ceil(qty_history[0])
-            has_data = True
-        else:
-            next_forecast = 0
-            has_data = False 
-
-        # --- ROP & EOQ ---
-        rop = 0
-        eoq = 0
-        
-        if next_forecast > 0:
-            daily_demand = next_forecast / WORKING_DAYS
-            annual_demand = next_forecast * 12
-            rop = math.ceil(daily_demand * LEAD_TIME_DAYS)
-            
-            holding_cost = p.price * HOLDING_RATE
-            if holding_cost > 0:
-                eoq = math.ceil(math.sqrt((2 * annual_demand * ORDER_COST) / holding_cost))
-
-        # --- STATUS ---
-        status = ""
-        action = ""
-        status_class = ""
-        
-        if not has_data:
-            if p.stock > 0:
-                status = "Produk Baru"
-                action = "Monitor Penjualan"
-                status_class = "info"
-            else:
-                status = "Stok Kosong"
-                action = "Input Stok Awal"
-                status_class = "warning"
+    unplanned = {}
+    for row in rows:
+        if row.status is None:
+            unplanned[row.id] = len(inventory_report)
+            inventory_report.append(None)
         else:
-            if p.stock <= rop:
-                status = "Bahaya"
-                buy_qty = int(eoq) if eoq > 0 else 10 
-                action = f"ORDER {buy_qty} pcs"
-                status_class = "danger"
-            elif p.stock > (rop + (eoq * 2)) and eoq > 0:
-                 status = "Overstock"
-                 action = "Stop Order"
-                 status_class = "success"
-            else:
-                 status = "Aman"
-                 action = "-"
-                 status_class = "success"
-
-        inventory_report.append({
-            'name': p.name,
-            'sku': p.sku,
-            'price': p.price,
-            'stock': p.stock,
-            'forecast': next_forecast,
-            'rop': rop,
-            'eoq': eoq,
-            'status': status,
-            'action': action,
-            'status_class': status_class
-        })
-
-    # 3. DATA PENDUKUNG    
-    all_sales = Sale.query.all()
-    # DEBUG: Cek Terminal saat refresh halaman reports
-    print(f"DEBUG SYSTEM: Ditemukan {len(all_sales)} transaksi penjualan.")
-    revenue_map = defaultdict(float)
-
-    for s in all_sales:
-        if s.created_at: # Pastikan tanggal tidak null
-            month_key = s.created_at.strftime('%Y-%m')
-            
-            # Gunakan kolom 'total' yang tersimpan di Sale
-            nominal = float(s.total or 0)
-            
-            revenue_map[month_key] += nominal
-
-    sales_chart_data = sorted([(k, v) for k, v in revenue_map.items()])
-
-    sales = db.session.query(func.date_format(Sale.created_at, "%Y-%m").label("month"),
-                             func.sum(Sale.total).label('total')).group_by('month').order_by('month').all()
-    top_products = db.session.query(Product.name, func.sum(Sale.qty).label('sold'))\
-                    .join(Sale, Sale.product_id == Product.id)\
-                    .group_by(Product.id).order_by(func.sum(Sale.qty).desc()).limit(10).all()
-
-    # DEBUG: Cek hasil grouping
-    print(f"DEBUG SYSTEM: Data Chart = {sales_chart_data}")
-
-    top_products_query = (
-        db.session.query(
-            Product.name,
-            func.sum(Sale.qty).label("sold")
+            inventory_report.append(reorder_report_row(row))
+    if unplanned:
+        for fresh in refresh_reorder_plan(unplanned):
+            inventory_report[unplanned[fresh['product_id']]] = fresh
+    return inventory_report
+
+def load_reports_data():
+    """Everything the reports page needs, without touching the sale table.
+
+    Tiga query: plan per produk dari reorder_plan, pendapatan per bulan dan
+    top 10 produk, keduanya GROUP BY di atas sales_monthly.
+    """
+    sales = [
+        (month, float(revenue or 0))
+        for month, revenue in (
+            db.session.query(SalesRollup.month, func.sum(SalesRollup.revenue))
+            .filter(SalesRollup.orders > 0)
+            .group_by(SalesRollup.month)
+            .order_by(SalesRollup.month)
         )
-        .join(Sale, Sale.product_id == Product.id) # Inner join standard
-        .group_by(Product.id)
-        .order_by(func.sum(Sale.qty).desc())
-        .limit(10)
-        .all()
-    )
-    top_products = [(n, int(s or 0)) for n, s in top_products_query]
+    ]
+    sold = func.sum(SalesRollup.qty)
+    top_products = [
+        (name, int(qty or 0))
+        for name, qty in (
+            db.session.query(Product.name, sold)
+            .join(SalesRollup, SalesRollup.product_id == Product.id)
+            .filter(SalesRollup.orders > 0)
+            .group_by(Product.id, Product.name)
+            .order_by(sold.desc(), Product.id)
+            .limit(10)
+        )
+    ]
+    first_month = bucket_key(period_start('month', REPORT_MONTHS - 1), 'month')
+
+    return {
+        'inventory_report': load_inventory_report(),
+        'sales': sales,
+        'sales_chart_data': [(m, total) for m, total in sales if m >= first_month],
+        'top_products': top_products,
+    }
+
+def reports_data():
+    return cached('reports', load_reports_data)
+
+@app.route('/reports')
+@login_required
+def reports():
+    user = current_user()
+    # Stok, forecast, ROP/EOQ, pendapatan bulanan & top 10 (di-cache sampai data berubah)
+    data = reports_data()
 
     return render_template(
         'system/reports.html',
         user=user,
         role=user.role,            
-        inventory_report=inventory_report,
-        sales=sales,
-        sales_chart_data=sales_chart_data,
-        top_products=top_products,
+        inventory_report=data['inventory_report'],
+        sales=data['sales'],
+        sales_chart_data=data['sales_chart_data'],
+        top_products=data['top_products'],
         title="Laporan & Analisis Stok"
     )
 
+# Export
+EXPORT_BATCH = 2000
+EXPORT_COLUMNS = {
+    'sales': ['id', 'tanggal', 'product_id', 'sku', 'produk', 'qty', 'total'],
+    'returns': ['id', 'tanggal', 'product_id', 'sku', 'produk', 'qty', 'alasan'],
+    'inventory': ['produk', 'sku', 'harga', 'stok', 'forecast', 'rop', 'eoq', 'status', 'aksi'],
+}
+
+def parse_date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        abort(400)
+
+def export_rows(dataset, start=None, end=None):
+    """Yield export rows, streamed from a server-side cursor.
+
+    ``yield_per`` + ``stream_results`` keep only one batch of rows in
+    memory, however large the table is.
+    """
+    if dataset == 'inventory':
+        for item in reports_data()['inventory_report']:
+            yield (item['name'], item['sku'], item['price'], item['stock'], item['forecast'],
+                   item['rop'], item['eoq'], item['status'], item['action'])
+        return
+
+    model, extra = (Sale, Sale.total) if dataset == 'sales' else (Return, Return.reason)
+    query = (
+        db.session.query(model.id, model.created_at, model.product_id,
+                         Product.sku, Product.name, model.qty, extra)
+        .outerjoin(Product, Product.id == model.product_id)
+        # end inklusif: sampai akhir hari itu
+        .filter(in_range(model.created_at, start, end + timedelta(days=1) if end else None))
+        .order_by(model.id)
+    )
+    yield from query.execution_options(stream_results=True, yield_per=EXPORT_BATCH)
+
+def stream_csv(header, rows):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(header)
+    for n, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if n % EXPORT_BATCH == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+def build_xlsx(header, rows):
+    """XLSX bytes of ``rows``, yielded in 64 KB chunks.
+
+    Not a stream: the whole workbook is built and saved before the first
+    chunk goes out. Write-only mode only keeps openpyxl from holding a cell
+    object per value.
+    """
+    from openpyxl import Workbook
+    from tempfile import TemporaryFile
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(header)
+    for row in rows:
+        ws.append(list(row))
+    with TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(64 * 1024)
+            if not chunk:
+                break
+            yield chunk
+
+@app.route('/export/<dataset>.<fmt>')
+@login_required
+def export_data(dataset, fmt):
+    if dataset not in EXPORT_COLUMNS or fmt not in ('csv', 'xlsx'):
+        abort(404)
+    start = parse_date_arg('start')
+    end = parse_date_arg('end')
+    rows = export_rows(dataset, start, end)
+    filename = f"{dataset}-{date.today().isoformat()}.{fmt}"
+
+    if fmt == 'xlsx':
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            return "Export XLSX butuh paket openpyxl", 501
+        body = build_xlsx(EXPORT_COLUMNS[dataset], rows)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        body = stream_csv(EXPORT_COLUMNS[dataset], rows)
+        mimetype = 'text/csv'
+
+    return app.response_class(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
 #staff
 def get_sidebar_menu():
     role = session.get('role')
@@ -721,6 +1722,8 @@ def update_staff(id):
     s.created_at = request.form.get('created_at') or s.created_at
 
     db.session.commit()
+    # role user hasil sinkron staff bisa berubah
+    forget_user()
     flash('Staff updated', 'success')
     return redirect(url_for('staff_page'))
 
@@ -730,40 +1733,182 @@ def delete_staff(id):
     s = Staff.query.get_or_404(id)
     db.session.delete(s)
     db.session.commit()
+    forget_user()
     flash('Staff deleted', 'warning')
     return redirect(url_for('staff_page'))
 
-@event.listens_for(Staff, "after_insert")
-def create_user_after_staff_insert(mapper, connection, staff):
-    username = staff.name.lower().replace(" ", "")
-
-    connection.execute(
-        User.__table__.insert().values(
-            username=username,
-            password="123",
-            role=staff.role
-        )
-    )
-
-@event.listens_for(Staff, "after_update")
-def update_user_after_staff_update(mapper, connection, staff):
-    if not staff.email:
-        return
+def import_staff(lines, strict=True):
+    """Insert a batch of staff and their User accounts in one transaction.
+
+    Each line needs ``name`` and ``role`` (``email``, ``phone`` and
+    ``created_at`` optional). Usernames (derived like add_staff does) and
+    emails are checked against the batch itself and against the database
+    with one query each, before anything is written. Staff and User rows
+    then go in as two executemany INSERTs and the users are linked to their
+    staff rows with one UPDATE; the per-row after_flush user sync is not
+    involved since no Staff objects pass through the session.
+
+    Returns ``(inserted, errors)``; with ``strict`` any error aborts the
+    whole batch.
+    """
+    errors = []
+    parsed = []
+    seen_usernames = {}
+    seen_emails = {}
+    for n, line in enumerate(lines, start=1):
+        try:
+            name = (line.get('name') or line.get('staff_name') or '').strip()
+            role = (line.get('role') or '').strip()
+            email = (line.get('email') or '').strip() or None
+            phone = (line.get('phone') or '').strip() or None
+            created_at = parse_sale_datetime(line.get('created_at'))
+        except (AttributeError, ValueError) as e:
+            errors.append({'line': n, 'error': str(e)})
+            continue
+        if not name or not role:
+            errors.append({'line': n, 'error': "name dan role wajib diisi"})
+            continue
+        username = staff_username(name)
+        if username in seen_usernames:
+            errors.append({'line': n, 'error': f"username {username} duplikat dengan baris {seen_usernames[username]}"})
+            continue
+        if email and email in seen_emails:
+            errors.append({'line': n, 'error': f"email {email} duplikat dengan baris {seen_emails[email]}"})
+            continue
+        seen_usernames[username] = n
+        if email:
+            seen_emails[email] = n
+        parsed.append((n, username, {'name': name, 'role': role, 'email': email,
+                                     'phone': phone, 'created_at': created_at}))
+
+    # satu query untuk semua bentrokan username, satu untuk email
+    taken_usernames = set()
+    taken_emails = set()
+    if parsed:
+        taken_usernames = {u for (u,) in db.session.query(User.username)
+                           .filter(User.username.in_([u for _, u, _ in parsed]))}
+        emails = [row['email'] for _, _, row in parsed if row['email']]
+        if emails:
+            taken_emails = {e for (e,) in db.session.query(Staff.email).filter(Staff.email.in_(emails))}
+
+    staff_rows = []
+    user_rows = []
+    for n, username, row in parsed:
+        if username in taken_usernames:
+            errors.append({'line': n, 'error': f"username {username} sudah dipakai"})
+            continue
+        if row['email'] in taken_emails:
+            errors.append({'line': n, 'error': f"email {row['email']} sudah terdaftar"})
+            continue
+        staff_rows.append(row)
+        user_rows.append({'username': username, 'password': "123", 'role': row['role']})
+
+    errors.sort(key=lambda e: e['line'])
+    if (strict and errors) or not staff_rows:
+        db.session.rollback()
+        return 0, errors
+
+    db.session.execute(Staff.__table__.insert(), staff_rows)
+    db.session.execute(User.__table__.insert(), user_rows)
+    link_staff_users([u['username'] for u in user_rows])
+    db.session.commit()
+    return len(staff_rows), errors
 
-    user = User.query.filter_by(username=staff.email).first()
-    if user:
-        user.role = staff.role
-        db.session.commit()
+@app.route('/staff/import', methods=['POST'])
+@login_required
+def import_staff_upload():
+    user = current_user()
+    wants_json = request.is_json or request.accept_mimetypes.best == 'application/json'
+    if user.role not in ('owner', 'developer'):
+        if wants_json:
+            return jsonify(error="Hanya owner / developer"), 403
+        flash("Hanya owner / developer yang bisa import staff.", "danger")
+        return redirect(url_for('staff_page'))
+
+    lines = bulk_lines_from_request('staff')
+    if lines is None:
+        if wants_json:
+            return jsonify(error="Kirim JSON (list / {\"staff\": [...]}), text/csv, atau file CSV"), 415
+        flash("Pilih file CSV untuk diimport.", "danger")
+        return redirect(url_for('staff_page'))
+
+    strict = request.values.get('partial') not in ('1', 'true', 'on')
+    inserted, errors = import_staff(lines, strict=strict)
+    forget_user()
+
+    if wants_json:
+        return jsonify(inserted=inserted, errors=errors), (422 if errors and not inserted else 200)
+    for e in errors[:10]:
+        flash(f"Baris {e['line']}: {e['error']}", "danger")
+    flash(f"{inserted} staff diimport, {len(errors)} baris error", "success" if inserted else "warning")
+    return redirect(url_for('staff_page'))
 
-@event.listens_for(Staff, "after_delete")
-def delete_user_after_staff_delete(mapper, connection, staff):
-    if not staff.email:
+# Sinkronisasi Staff -> User: perubahan Staff dikumpulkan saat flush lalu
+# diterapkan sekali per flush (batch), dalam transaksi yang sama, tanpa
+# query ORM atau commit tambahan di tengah flush.
+def staff_username(name):
+    return name.lower().replace(" ", "")
+
+def collect_staff_changes(session):
+    inserts = []
+    role_updates = defaultdict(set)
+    renames = {}
+    deletes = set()
+
+    for obj in session.new:
+        if isinstance(obj, Staff):
+            inserts.append({'username': staff_username(obj.name), 'password': "123",
+                            'role': obj.role, 'staff_id': obj.id})
+
+    for obj in session.dirty:
+        if not isinstance(obj, Staff):
+            continue
+        state = inspect(obj)
+        if state.attrs.role.history.has_changes():
+            role_updates[obj.role].add(obj.id)
+        if state.attrs.name.history.has_changes():
+            renames[obj.id] = staff_username(obj.name)
+
+    for obj in session.deleted:
+        if isinstance(obj, Staff):
+            deletes.add(obj.id)
+
+    return inserts, role_updates, renames, deletes
+
+@event.listens_for(db.session, "after_flush")
+def sync_users_after_staff_flush(session, flush_context):
+    inserts, role_updates, renames, deletes = collect_staff_changes(session)
+    if not (inserts or role_updates or renames or deletes):
         return
 
-    user = User.query.filter_by(username=staff.email).first()
-    if user:
-        db.session.delete(user)
-        db.session.commit()
+    users = User.__table__
+    conn = session.connection()
+    if inserts:
+        conn.execute(users.insert(), inserts)
+    for role, staff_ids in role_updates.items():
+        conn.execute(users.update().where(users.c.staff_id.in_(staff_ids)).values(role=role))
+    for staff_id, username in renames.items():
+        conn.execute(users.update().where(users.c.staff_id == staff_id).values(username=username))
+    if deletes:
+        conn.execute(users.delete().where(users.c.staff_id.in_(deletes)))
+
+def link_staff_users(usernames=None):
+    """Fill User.staff_id for accounts created before the column existed.
+
+    Matches the username derived from the staff name (newest staff wins);
+    returns the number of users updated.
+    """
+    derived = func.lower(func.replace(Staff.name, ' ', ''))
+    staff_id = (
+        db.session.query(func.max(Staff.id))
+        .filter(derived == User.username)
+        .scalar_subquery()
+    )
+    query = User.query.filter(User.staff_id.is_(None),
+                              User.username.in_(db.session.query(derived)))
+    if usernames is not None:
+        query = query.filter(User.username.in_(usernames))
+    return query.update({User.staff_id: staff_id}, synchronize_session=False)
 
 @app.route("/change-password", methods=["GET", "POST"])
 def change_password():
@@ -787,6 +1932,7 @@ def change_password():
 
         user.password = new_password
         db.session.commit()
+        forget_user(user.id)
 
         flash("Password berhasil diubah!", "success")
         return redirect(url_for("dashboard"))
@@ -826,6 +1972,7 @@ def reset_password():
 
         user.password = new_password
         db.session.commit()
+        forget_user(user.id)
 
         session.pop("reset_user_id", None)
 
@@ -835,11 +1982,428 @@ def reset_password():
     return render_template("auth/reset_password.html", user=user)
 
 
+API_PRODUCT_FIELDS = {
+    'id': Product.id,
+    'name': Product.name,
+    'sku': Product.sku,
+    'price': Product.price,
+    'category': Product.category,
+    'stock': Product.stock,
+    'description': Product.description,
+    'image': Product.image,
+}
+API_DEFAULT_FIELDS = ('id', 'name', 'price', 'stock')
+
+
+def api_error(message, status=400):
+    """Stop the request with a JSON ``{"error": ...}`` body."""
+    resp = jsonify(error=message)
+    resp.status_code = status
+    abort(resp)
+
+
+def api_list_arg(name, allowed, label, default=()):
+    """Comma separated query arg as a tuple; empty items are ignored.
+
+    A missing or empty value (``?fields=`` / ``?fields=,``) gives ``default``;
+    values not in ``allowed`` end the request with 400.
+    """
+    values = tuple(v.strip() for v in (request.args.get(name) or '').split(',') if v.strip())
+    unknown = [v for v in values if v not in allowed]
+    if unknown:
+        api_error(f"{label} tidak dikenal: {', '.join(unknown)}")
+    return values or tuple(default)
+
+
+def api_page_args():
+    """``(cursor, limit)`` for keyset paging, limit clamped to API_MAX_PAGE_SIZE."""
+    try:
+        cursor = int(request.args.get('cursor') or 0)
+        limit = int(request.args.get('limit') or API_PAGE_SIZE)
+    except ValueError:
+        api_error("cursor dan limit harus angka")
+    return cursor, max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+def api_next_page(resp, endpoint, next_cursor, limit, **params):
+    """Point ``resp`` at the next page via ``X-Next-Cursor`` and a ``Link`` header."""
+    resp.headers['X-Next-Cursor'] = str(next_cursor)
+    resp.headers['Link'] = '<{}>; rel="next"'.format(url_for(
+        endpoint, cursor=next_cursor, limit=limit, _external=True, **params))
+
+
 @app.route('/api/products')
 def api_products():
-    items = Product.query.all()
-    data = [{'id':p.id,'name':p.name,'price':p.price,'stock':p.stock} for p in items]
-    return jsonify(data)
+    fields = api_list_arg('fields', API_PRODUCT_FIELDS, 'Field', default=API_DEFAULT_FIELDS)
+    cursor, limit = api_page_args()
+
+    # Versi katalog naik setiap ada perubahan produk / stok, jadi poll yang
+    # datanya belum berubah cukup dijawab 304 tanpa menyentuh tabel product.
+    etag = f"catalog-{get_counter('catalog')}-{','.join(fields)}-{cursor}-{limit}"
+    if request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    columns = [API_PRODUCT_FIELDS[f] for f in fields if f != 'id']
+    rows = (
+        db.session.query(Product.id, *columns)
+        .filter(Product.id > cursor)
+        .order_by(Product.id)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    data = [{f: getattr(r, f) for f in fields} for r in rows]
+    resp = jsonify(data)
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    if has_more:
+        api_next_page(resp, 'api_products', rows[-1].id, limit,
+                      fields=None if fields == API_DEFAULT_FIELDS else ','.join(fields))
+    return resp
+
+@app.route('/api/reorder')
+@login_required
+def api_reorder():
+    """Stored reorder recommendations, keyset-paged by product id.
+
+    ``?status=danger`` (or any planning.STATUS_KEYS, comma separated)
+    limits the rows to those statuses.
+    """
+    statuses = api_list_arg('status', STATUS_KEYS, 'Status')
+    cursor, limit = api_page_args()
+
+    query = (
+        db.session.query(ReorderPlan, Product.sku, Product.name, Product.stock)
+        .join(Product, Product.id == ReorderPlan.product_id)
+        .filter(ReorderPlan.product_id > cursor)
+    )
+    if statuses:
+        query = query.filter(ReorderPlan.status.in_([STATUS_KEYS[s] for s in statuses]))
+    rows = query.order_by(ReorderPlan.product_id).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    status_names = {code: key for key, code in STATUS_KEYS.items()}
+    resp = jsonify([
+        {
+            'product_id': plan.product_id,
+            'sku': sku,
+            'name': name,
+            'stock': stock,
+            'forecast': plan.forecast,
+            'rop': plan.rop,
+            'eoq': plan.eoq,
+            'status': status_names[plan.status],
+            'action': plan.action,
+            'model': plan.model,
+            'updated_at': plan.updated_at.isoformat() if plan.updated_at else None,
+        }
+        for plan, sku, name, stock in rows
+    ])
+    if has_more:
+        api_next_page(resp, 'api_reorder', rows[-1][0].product_id, limit,
+                      status=','.join(statuses) or None)
+    return resp
+
+@app.route('/api/notifications')
+@login_required
+def api_notifications():
+    """Latest in-app notifications; ``?unread=1`` for unread ones only."""
+    query = Notification.query
+    if request.args.get('unread') in ('1', 'true'):
+        query = query.filter(Notification.read_at.is_(None))
+    rows = query.order_by(Notification.id.desc()).limit(NOTIFICATION_PAGE_SIZE).all()
+    return jsonify([
+        {
+            'id': n.id,
+            'kind': n.kind,
+            'product_id': n.product_id,
+            'message': n.message,
+            'created_at': n.created_at.isoformat() if n.created_at else None,
+            'read': n.read_at is not None,
+        }
+        for n in rows
+    ])
+
+@app.route('/api/notifications/read', methods=['POST'])
+@login_required
+def read_notifications():
+    Notification.query.filter(Notification.read_at.is_(None))\
+        .update({'read_at': datetime.utcnow()}, synchronize_session=False)
+    db.session.commit()
+    return jsonify(ok=True)
+
+# -------------------------
+# Developer profiler
+# -------------------------
+# Request dengan header X-Profile: 1 / ?_profile=1 dari user developer
+# dijalankan di bawah cProfile; hasilnya bisa dilihat di /dev/profiles.
+profile_store = profiler.ProfileStore(os.path.join(app.instance_path, 'profiles'),
+                                      keep=PROFILE_KEEP)
+
+@app.before_request
+def start_request_profile():
+    if profiler.requested(request) and is_developer():
+        g.profile = profiler.start()
+        g.profile_start = time.perf_counter()
+
+@app.after_request
+def save_request_profile(response):
+    profile = g.pop('profile', None)
+    if profile is not None:
+        name = profile_store.save(profile, request.endpoint,
+                                  time.perf_counter() - g.profile_start)
+        response.headers['X-Profile-Id'] = name
+    return response
+
+@app.teardown_request
+def stop_request_profile(exc):
+    # after_request tidak jalan kalau view / hook lain melempar exception;
+    # tanpa ini cProfile tetap aktif untuk semua request berikutnya di worker ini
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.disable()
+
+def developer_required(f):
+    from functools import wraps
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not current_user():
+            return redirect(url_for('login', next=request.path))
+        if not is_developer():
+            abort(403)
+        return f(*args, **kwargs)
+    return wrapper
+
+@app.route('/dev/profiles')
+@developer_required
+def dev_profiles():
+    user = current_user()
+    return render_template(
+        'system/profiles.html',
+        user=user,
+        role=user.role,
+        profiles=profile_store.entries(),
+        title="Profil Request"
+    )
+
+@app.route('/dev/profiles/<name>')
+@developer_required
+def dev_profile(name):
+    if not profile_store.exists(name):
+        abort(404)
+    if request.args.get('download'):
+        return send_from_directory(profile_store.folder, name, as_attachment=True)
+    user = current_user()
+    sort = request.args.get('sort', 'cumulative')
+    return render_template(
+        'system/profiles.html',
+        user=user,
+        role=user.role,
+        profiles=profile_store.entries(),
+        current=name,
+        sort=sort,
+        sort_keys=profiler.SORT_KEYS,
+        report=profile_store.report(name, sort),
+        title="Profil Request"
+    )
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text exposition of this worker's request / SQL metrics."""
+    token = app.config['METRICS_TOKEN']
+    if token and request.headers.get('Authorization') != f"Bearer {token}":
+        abort(401)
+    return app.response_class(instrumentation.metrics.render(),
+                              mimetype='text/plain; version=0.0.4')
+
+# -------------------------
+# CLI
+# -------------------------
+@app.cli.command("rollup-rebuild")
+def rollup_rebuild_command():
+    """Backfill / rebuild the monthly sales rollup from sale and return."""
+    db.create_all()
+    n = rebuild_sales_rollup()
+    print(f"sales_monthly: {n} baris")
+
+@app.cli.command("plan-inventory")
+def plan_inventory_command():
+    """Compute the reorder plan for every product and print it (read-only)."""
+    for row in plan_reorder():
+        print(f"{row['name'][:40]:40} stok={row['stock'] or 0:>5} forecast={row['forecast']:>5} "
+              f"rop={row['rop']:>5} eoq={row['eoq']:>5} {row['status']:12} "
+              f"{row['model'] or '-':16} {row['action']}")
+
+@app.cli.command("plan-check")
+@click.option("--products", default=20000, show_default=True, help="Jumlah produk acak.")
+@click.option("--seed", default=1, show_default=True)
+def plan_check_command(products, seed):
+    """Check the vectorized planner against the per-product reference."""
+    mismatch = check_equivalence(products, seed)
+    if mismatch:
+        raise click.ClickException(f"Hasil berbeda untuk produk: {mismatch[:20]}")
+    print(f"OK: {products} produk identik dengan perhitungan per produk")
+
+@app.cli.command("reorder-refresh")
+def reorder_refresh_command():
+    """Recompute the reorder_plan table for every product (for cron)."""
+    db.create_all()
+    rows = refresh_reorder_plan()
+    mark_data_changed()
+    danger = sum(1 for r in rows if r['status_code'] == STATUS_DANGER)
+    print(f"reorder_plan: {len(rows)} produk, {danger} perlu order")
+
+@app.cli.command("forecast-backtest")
+@click.option("--holdout", default=FORECAST_HOLDOUT_MONTHS, show_default=True,
+              help="Bulan terakhir yang dipakai untuk mengukur error.")
+def forecast_backtest_command(holdout):
+    """Backtest every forecasting model and show which wins per SKU."""
+    product_ids = [pid for (pid,) in db.session.query(Product.id).order_by(Product.id)]
+    demand = (
+        db.session.query(SalesRollup.product_id, SalesRollup.month, SalesRollup.qty)
+        .filter(SalesRollup.orders > 0)
+        .all()
+    )
+    matrix, lengths = forecasting.series_matrix(product_ids, demand, last_full_month())
+    summary, scored, overall = forecasting.backtest_summary(matrix, lengths, holdout)
+
+    print(f"{scored} dari {len(product_ids)} produk punya history cukup untuk backtest")
+    print(f"{'model':16} {'menang':>7} {'MAE rata2':>10}")
+    for name, wins, avg in summary:
+        print(f"{name:16} {wins:>7} {avg:>10.2f}")
+    print(f"{'terpilih':16} {scored:>7} {overall:>10.2f}")
+
+def add_missing_columns():
+    """ALTER existing tables to add columns / indexes declared on the models.
+
+    db.create_all() only creates new tables; this covers columns added to
+    tables that already exist (e.g. product.category_key).
+    """
+    inspector = inspect(db.engine)
+    added = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c['name'] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=db.engine.dialect)
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {db.engine.dialect.identifier_preparer.quote(table.name)} "
+                    f"ADD COLUMN {column.name} {col_type}"
+                )
+                added.append(f"{table.name}.{column.name}")
+            indexes = {i['name'] for i in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(conn)
+                    added.append(index.name)
+    return added
+
+@app.cli.command("db-sync")
+def db_sync_command():
+    """Create new tables, add new columns/indexes and backfill derived data."""
+    db.create_all()
+    for name in add_missing_columns():
+        print(f"ditambahkan: {name}")
+
+    # backfill category_key untuk produk lama
+    for p in Product.query.filter(Product.category_key.is_(None), Product.category.isnot(None)):
+        p.category_key = normalize_category(p.category)
+    db.session.commit()
+    print("category_key OK")
+
+    print(f"user.staff_id: {link_staff_users()} akun staff ditautkan")
+    db.session.commit()
+
+    rebuild_search_index()
+    print("search index OK")
+
+@app.cli.command("import-sales")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--strict", is_flag=True, help="Batalkan seluruh batch jika ada baris yang error.")
+def import_sales_command(path, strict):
+    """Import sales from a CSV or JSON file (e.g. a POS export)."""
+    inserted, errors = ingest_sales(bulk_lines_from_file(path, 'sales'), strict=strict)
+    print_import_errors(errors)
+    print(f"{inserted} penjualan diimport, {len(errors)} baris error")
+
+@app.cli.command("import-staff")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--partial", is_flag=True, help="Tetap import baris yang valid walau ada error.")
+def import_staff_command(path, partial):
+    """Import staff (and their user accounts) from a CSV or JSON file."""
+    inserted, errors = import_staff(bulk_lines_from_file(path, 'staff'), strict=not partial)
+    print_import_errors(errors)
+    print(f"{inserted} staff diimport, {len(errors)} baris error")
+
+@app.cli.command("images-rebuild")
+def images_rebuild_command():
+    """Move product images to content-hash names and build all variants."""
+    folder = app.config['UPLOAD_FOLDER']
+    for p in Product.query.filter(Product.image.isnot(None)):
+        path = os.path.join(folder, p.image)
+        if not os.path.exists(path):
+            print(f"hilang: {p.image}")
+            continue
+        if not images.HASH_NAME.match(p.image):
+            with open(path, 'rb') as f:
+                data = f.read()
+            name = images.content_name(data, p.image)
+            if not os.path.exists(os.path.join(folder, name)):
+                with open(os.path.join(folder, name), 'wb') as f:
+                    f.write(data)
+            p.image = name
+        ok = images.build_variants(folder, p.image)
+        print(f"{p.image}: {'OK' if ok else 'GAGAL'}")
+    db.session.commit()
+    mark_data_changed()
+
+@app.cli.command("assets-build")
+def assets_build_command():
+    """Bundle, minify, fingerprint and precompress CSS/JS into static/dist."""
+    manifest = assets.build(app.static_folder, app.static_url_path + '/')
+    asset_manifest.clear()
+    asset_manifest.update(manifest)
+    for name, built in manifest.items():
+        print(f"{name} -> {assets.DIST}/{built}")
+
+@app.cli.command("datagen")
+@click.option("--products", default=10000, show_default=True, help="Jumlah produk baru.")
+@click.option("--sales", default=1000000, show_default=True, help="Jumlah penjualan.")
+@click.option("--years", default=2.0, show_default=True, help="Rentang history penjualan (tahun).")
+@click.option("--return-rate", default=0.02, show_default=True, help="Porsi penjualan yang diretur.")
+@click.option("--seed", default=42, show_default=True)
+@click.option("--yes", is_flag=True, help="Lewati konfirmasi.")
+def datagen_command(products, sales, years, return_rate, seed, yes):
+    """Fill the database with a synthetic catalog and sales history (dev / bench only)."""
+    if not yes:
+        click.confirm(f"Tambah data sintetis ke {db.engine.url.render_as_string(hide_password=True)}?",
+                      abort=True)
+    db.create_all()
+    ensure_search_index()
+
+    def progress(done, total):
+        print(f"\r{done}/{total} penjualan", end="", flush=True)
+
+    t0 = time.perf_counter()
+    n_products, n_sales, n_returns = datagen.generate(
+        db.session, Product.__table__, Sale.__table__, Return.__table__,
+        products=products, sales=sales, return_rate=return_rate, years=years, seed=seed,
+        progress=progress)
+    print()
+    rebuild_search_index()
+    # rollup dari nol, sekaligus refresh reorder_plan & versi data
+    rebuild_sales_rollup()
+    print(f"{n_products} produk, {n_sales} penjualan, {n_returns} retur "
+          f"({time.perf_counter() - t0:.1f}s)")
 
 if __name__ == '__main__':
     with app.app_context():
@@ -0,0 +1,131 @@
+"""Static asset build: bundle, minify, fingerprint and precompress.
+
+Each bundle has a logical name (the path templates already use, e.g.
+``css/styles.css``) and is built from its entry file with local
+``@import``s inlined. Output goes to ``static/dist`` as
+``<name>.<hash>.<ext>`` plus ``.gz`` / ``.br`` copies, and
+``manifest.json`` maps logical names to the fingerprinted files.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+
+BUNDLES = {
+    'css/styles.css': 'css/styles.css',   # halaman sistem
+    'css/landing.css': 'css/landing.css', # landing & kategori
+    'js/main.js': 'js/main.js',
+}
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+
+IMPORT_RE = re.compile(r'@import\s+(?:url\(\s*)?(["\']?)(.+?)\1\s*\)?\s*;')
+URL_RE = re.compile(r'url\(\s*(["\']?)([^"\')]+)\1\s*\)')
+STRING_RE = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+
+
+def is_remote(path):
+    return path.startswith(('http://', 'https://', '//', 'data:', '/'))
+
+
+def inline_css(static_folder, rel_path, static_url, remote_imports, seen=None):
+    """CSS of ``rel_path`` with local @imports inlined.
+
+    Relative ``url()``s are rewritten to absolute ``static_url`` paths since
+    the bundle is served from a different directory than its sources.
+    """
+    seen = seen if seen is not None else set()
+    if rel_path in seen:
+        return ''
+    seen.add(rel_path)
+
+    src_dir = os.path.dirname(rel_path)
+    with open(os.path.join(static_folder, rel_path), encoding='utf-8') as f:
+        css = f.read()
+
+    def rebase(match):
+        quote, url = match.groups()
+        if is_remote(url) or url.startswith('#'):
+            return match.group(0)
+        target = os.path.normpath(os.path.join(src_dir, url)).replace(os.sep, '/')
+        return f"url({quote}{static_url}{target}{quote})"
+
+    def expand(match):
+        target = match.group(2)
+        if is_remote(target):
+            remote_imports.append(match.group(0))
+            return ''
+        path = os.path.normpath(os.path.join(src_dir, target)).replace(os.sep, '/')
+        return inline_css(static_folder, path, static_url, remote_imports, seen)
+
+    css = IMPORT_RE.sub(expand, css)
+    return URL_RE.sub(rebase, css)
+
+
+def minify_css(css):
+    """Conservative CSS minifier; quoted strings are left untouched."""
+    parts = STRING_RE.split(css)
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            out.append(part)
+            continue
+        part = re.sub(r'/\*.*?\*/', '', part, flags=re.S)
+        part = re.sub(r'\s+', ' ', part)
+        part = re.sub(r'\s*([{};,>])\s*', r'\1', part)
+        part = re.sub(r':\s+', ':', part)
+        part = part.replace(';}', '}')
+        out.append(part)
+    return ''.join(out).strip()
+
+
+def build_bundle(static_folder, name, entry, static_url='/static/'):
+    if name.endswith('.css'):
+        remote_imports = []
+        body = inline_css(static_folder, entry, static_url, remote_imports)
+        # @import eksternal (font) wajib di paling atas
+        return '\n'.join(dict.fromkeys(remote_imports)) + '\n' + minify_css(body)
+    # JS cukup di-bundle & dikompres; tanpa minify agar aman
+    with open(os.path.join(static_folder, entry), encoding='utf-8') as f:
+        return f.read()
+
+
+def write_compressed(path, data):
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    try:
+        import brotli  # opsional
+    except ImportError:
+        return
+    with open(path + '.br', 'wb') as f:
+        f.write(brotli.compress(data, quality=11))
+
+
+def build(static_folder, static_url='/static/'):
+    """Build every bundle into static/dist and write the manifest."""
+    dist = os.path.join(static_folder, DIST)
+    manifest = {}
+    for name, entry in BUNDLES.items():
+        data = build_bundle(static_folder, name, entry, static_url).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        stem, ext = os.path.splitext(name)
+        out_name = f"{stem}.{digest}{ext}"
+        out_path = os.path.join(dist, out_name)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, 'wb') as f:
+            f.write(data)
+        write_compressed(out_path, data)
+        manifest[name] = out_name
+
+    with open(os.path.join(dist, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
@@ -0,0 +1,404 @@
+"""Mixed-workload load test against a running server.
+
+Virtual users run in threads, each looping over its scenario until the
+duration is up:
+
+* cashier  - logged in as a cashier, POSTs /sales/add (1 pc of a random
+             in-stock product)
+* owner    - logged in as the owner, polls /dashboard and /reports
+* visitor  - anonymous, browses /category/<name> and searches via /search
+
+Reports throughput, p50 / p95 / p99 latency and error rate per scenario
+and per action, saves the run as JSON and can diff against an earlier
+run. A cashier's add_sale only counts as ok when its redirect lands on
+/sales without an error flash (e.g. "Not enough stock").
+
+Use persistent multi-worker processes so writes and reads really contend
+and per-process caches stay warm. ``serve`` runs ``gunicorn -w N`` on a
+scratch database when gunicorn is installed; without it, it falls back to
+a single threaded werkzeug process and says so in the output:
+
+    python -m bench.loadtest serve --db sqlite:////tmp/load.db --processes 4 --port 5055
+    python -m bench.loadtest run --url http://127.0.0.1:5055 --mix cashier=4,owner=2,visitor=12 \\
+        --duration 60 --compare bench/results/loadtest-20250101T000000.json
+
+``run --spawn 4 --db ...`` starts and stops that server itself. Against
+MySQL/MariaDB, point ``serve --db`` (or your own gunicorn) at it instead.
+"""
+import argparse
+import http.cookiejar
+import importlib.util
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict, namedtuple
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CATEGORIES = ['Semua', 'New Arrival', 'Aksesoris', 'Half Face', 'Wanita', 'Full Face']
+SEARCH_TERMS = ['helm', 'kyt', 'visor', 'full', 'ink', 'busa', 'nhk', 'half']
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+TIMEOUT = 30
+FLASH_ERROR = b'class="alert danger"'
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+Response = namedtuple('Response', ['status', 'location', 'body'])
+
+
+class Session:
+    """Cookie-keeping HTTP client; POSTs don't follow redirects."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        jar = http.cookiejar.CookieJar()
+        cookies = urllib.request.HTTPCookieProcessor(jar)
+        self.follow = urllib.request.build_opener(cookies)
+        self.no_follow = urllib.request.build_opener(cookies, NoRedirect)
+
+    def request(self, path, data=None):
+        """``Response`` of a GET (or form POST when ``data`` is given)."""
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        opener = self.no_follow if body is not None else self.follow
+        url = urllib.parse.urljoin(self.base_url + '/', path)
+        try:
+            with opener.open(url, data=body, timeout=TIMEOUT) as resp:
+                return Response(resp.status, None, resp.read())
+        except urllib.error.HTTPError as e:
+            location = e.headers.get('Location')
+            return Response(e.code, location and urllib.parse.urljoin(url, location), e.read())
+
+    def login(self, username, password):
+        resp = self.request('/login', {'username': username, 'password': password})
+        if resp.status != 302 or urllib.parse.urlparse(resp.location).path == '/login':
+            raise SystemExit(f"login {username} gagal (HTTP {resp.status})")
+
+
+class Recorder:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)  # (scenario, action) -> [(detik, ok)]
+
+    def add(self, scenario, action, seconds, ok):
+        with self._lock:
+            self.samples[(scenario, action)].append((seconds, ok))
+
+
+def call(fn):
+    """(Response or None on a network error, seconds)."""
+    t0 = time.perf_counter()
+    try:
+        resp = fn()
+    except (OSError, urllib.error.URLError):
+        resp = None
+    return resp, time.perf_counter() - t0
+
+
+def timed(recorder, scenario, action, fn):
+    resp, seconds = call(fn)
+    recorder.add(scenario, action, seconds, resp is not None and resp.status == 200)
+    return resp
+
+
+def cashier(session, rng, recorder, ctx):
+    pid = rng.choice(ctx['product_ids'])
+    form = {'product_id': pid, 'qty': 1, 'created_at': datetime.now().strftime('%Y-%m-%dT%H:%M')}
+    resp, seconds = call(lambda: session.request('/sales/add', form))
+    # sukses maupun gagal (stok kurang, qty salah) sama-sama redirect ke /sales;
+    # bedanya hanya di flash, yang baru terlihat di halaman tujuan redirect.
+    # Browser kasir memang memuat halaman itu, jadi ikut diukur sebagai aksi sendiri.
+    ok = (resp is not None and resp.status == 302
+          and urllib.parse.urlparse(resp.location).path == '/sales')
+    if ok:
+        page = timed(recorder, 'cashier', 'sales_page', lambda: session.request(resp.location))
+        ok = page is not None and page.status == 200 and FLASH_ERROR not in page.body
+    recorder.add('cashier', 'add_sale', seconds, ok)
+
+
+def owner(session, rng, recorder, ctx):
+    if rng.random() < 0.5:
+        timed(recorder, 'owner', 'dashboard', lambda: session.request('/dashboard'))
+    else:
+        timed(recorder, 'owner', 'reports', lambda: session.request('/reports'))
+
+
+def visitor(session, rng, recorder, ctx):
+    if rng.random() < 0.7:
+        path = '/category/' + urllib.parse.quote(rng.choice(CATEGORIES))
+        timed(recorder, 'visitor', 'category', lambda: session.request(path))
+    else:
+        path = '/search?' + urllib.parse.urlencode({'q': rng.choice(SEARCH_TERMS)})
+        timed(recorder, 'visitor', 'search', lambda: session.request(path))
+
+
+SCENARIOS = {'cashier': cashier, 'owner': owner, 'visitor': visitor}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, count = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"skenario tidak dikenal: {name}")
+        mix[name] = int(count or 1)
+    return mix
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def summarize(samples, duration):
+    def stats(items):
+        latencies = sorted(s for s, _ in items)
+        errors = sum(1 for _, ok in items if not ok)
+        return {
+            'requests': len(items),
+            'throughput': len(items) / duration if duration else 0.0,
+            'error_rate': errors / len(items) if items else 0.0,
+            'p50_ms': (percentile(latencies, 50) or 0) * 1000,
+            'p95_ms': (percentile(latencies, 95) or 0) * 1000,
+            'p99_ms': (percentile(latencies, 99) or 0) * 1000,
+        }
+
+    by_scenario = defaultdict(list)
+    actions = {}
+    for (scenario, action), items in sorted(samples.items()):
+        by_scenario[scenario].extend(items)
+        actions[f"{scenario}.{action}"] = stats(items)
+    return {
+        'scenarios': {name: stats(items) for name, items in sorted(by_scenario.items())},
+        'actions': actions,
+        'total': stats([s for items in samples.values() for s in items]),
+    }
+
+
+def product_ids(base_url):
+    """Ids of in-stock products, via the public products API."""
+    ids = []
+    cursor = 0
+    while True:
+        query = urllib.parse.urlencode({'fields': 'id,stock', 'limit': 500, 'cursor': cursor})
+        with urllib.request.urlopen(f"{base_url}/api/products?{query}", timeout=TIMEOUT) as resp:
+            rows = json.load(resp)
+            next_cursor = resp.headers.get('X-Next-Cursor')
+        ids.extend(r['id'] for r in rows if (r.get('stock') or 0) > 0)
+        if not next_cursor:
+            return ids
+        cursor = next_cursor
+
+
+def run_load(args):
+    mix = parse_mix(args.mix)
+    ctx = {'product_ids': product_ids(args.url) if 'cashier' in mix else []}
+    if 'cashier' in mix and not ctx['product_ids']:
+        raise SystemExit("tidak ada produk dengan stok; isi data dulu (flask datagen)")
+
+    recorder = Recorder()
+    deadline = [None]
+    ready = threading.Barrier(sum(mix.values()) + 1)
+
+    def user(scenario, n):
+        rng = random.Random(args.seed * 1000 + n)
+        session = Session(args.url)
+        if scenario == 'cashier':
+            session.login(args.cashier_user, args.password)
+        elif scenario == 'owner':
+            session.login(args.owner_user, args.password)
+        ready.wait()
+        step = SCENARIOS[scenario]
+        while time.monotonic() < deadline[0]:
+            step(session, rng, recorder, ctx)
+            if args.think:
+                time.sleep(rng.uniform(0, 2 * args.think))
+
+    threads = []
+    n = 0
+    for scenario, count in mix.items():
+        for _ in range(count):
+            threads.append(threading.Thread(target=user, args=(scenario, n), daemon=True))
+            n += 1
+    for t in threads:
+        t.start()
+    deadline[0] = time.monotonic() + args.duration
+    ready.wait()
+    started = time.monotonic()
+    for t in threads:
+        t.join()
+    duration = time.monotonic() - started
+
+    return {
+        'at': datetime.utcnow().isoformat(timespec='seconds'),
+        'url': args.url,
+        'server': args.server,
+        'mix': mix,
+        'duration': duration,
+        'think': args.think,
+        **summarize(recorder.samples, duration),
+    }
+
+
+def print_result(result, baseline=None):
+    def delta(section, key, field):
+        if not baseline or key not in baseline.get(section, {}):
+            return ''
+        old = baseline[section][key][field]
+        new = result[section][key][field]
+        if not old:
+            return ''
+        return f" ({(new - old) / old * 100:+.0f}%)"
+
+    print(f"server: {result['server']}")
+    if result['server'].startswith('werkzeug'):
+        print("  catatan: satu proses, bukan multi-worker; angka tidak mewakili deployment")
+    if baseline and baseline.get('server') != result['server']:
+        print(f"  catatan: baseline memakai server lain ({baseline.get('server', '?')})")
+    print(f"{'':22} {'req':>7} {'req/s':>8} {'err%':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    rows = [('scenarios', k) for k in result['scenarios']] + [('actions', k) for k in result['actions']]
+    for section, key in rows:
+        s = result[section][key]
+        print(f"{key:22} {s['requests']:>7} {s['throughput']:>8.1f} {s['error_rate'] * 100:>6.1f} "
+              f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f}"
+              f"{delta(section, key, 'p95_ms')}")
+    t = result['total']
+    print(f"{'total':22} {t['requests']:>7} {t['throughput']:>8.1f} {t['error_rate'] * 100:>6.1f} "
+          f"{t['p50_ms']:>8.1f} {t['p95_ms']:>8.1f} {t['p99_ms']:>8.1f}")
+
+
+def save_result(result, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+    path = os.path.join(out_dir, f"loadtest-{stamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    return path
+
+
+def server_kind(processes):
+    """How ``serve`` will run: persistent gunicorn workers when installed."""
+    if importlib.util.find_spec('gunicorn') is not None:
+        return f"gunicorn -w {processes}"
+    return "werkzeug threaded, 1 process"
+
+
+def spawn_server(db, port, processes):
+    cmd = [sys.executable, '-m', 'bench.loadtest', 'serve', '--db', db,
+           '--port', str(port), '--processes', str(processes)]
+    proc = subprocess.Popen(cmd, cwd=ROOT)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url + '/api/products?limit=1', timeout=1).read()
+            return proc, url
+        except OSError:
+            if proc.poll() is not None:
+                raise SystemExit("server gagal start")
+            time.sleep(0.2)
+    proc.terminate()
+    raise SystemExit("server tidak merespons")
+
+
+def serve(args):
+    # config membaca DATABASE_URL saat import, jadi harus di-set sebelum import app
+    os.environ['DATABASE_URL'] = args.db
+    import app as A
+
+    with A.app.app_context():
+        A.init_db()
+        # worker tidak boleh mewarisi koneksi pool milik proses ini
+        A.db.engine.dispose()
+
+    kind = server_kind(args.processes)
+    print(f"server: {kind}", flush=True)
+    if kind.startswith('gunicorn'):
+        # worker persisten (pre-fork): cache per proses, profiler dan antrean
+        # alert hidup selama run, seperti di produksi
+        os.execvp(sys.executable, [
+            sys.executable, '-m', 'gunicorn', '-w', str(args.processes),
+            '-b', f"{args.host}:{args.port}", '--chdir', ROOT, 'app:app'])
+
+    # Tanpa gunicorn: satu proses dengan thread per request. Werkzeug
+    # `processes=N` fork satu child per request, sehingga setiap request
+    # mulai dengan cache kosong dan hasilnya hanya mengukur cold start.
+    print("gunicorn tidak terpasang: satu proses threaded, bukan multi-worker; "
+          "pasang gunicorn untuk --processes > 1", flush=True)
+    from werkzeug.serving import run_simple
+    run_simple(args.host, args.port, A.app, threaded=True, use_reloader=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_serve = sub.add_parser('serve', help='start a multi-worker server for the test')
+    p_serve.add_argument('--db', required=True, help='database URL')
+    p_serve.add_argument('--host', default='127.0.0.1')
+    p_serve.add_argument('--port', type=int, default=5055)
+    p_serve.add_argument('--processes', type=int, default=4)
+
+    p_run = sub.add_parser('run', help='run the load test')
+    p_run.add_argument('--url', default='http://127.0.0.1:5055')
+    p_run.add_argument('--spawn', type=int, metavar='N',
+                       help='start `serve` with N workers on --db for the run')
+    p_run.add_argument('--db', help='database URL for --spawn')
+    p_run.add_argument('--port', type=int, default=5055, help='port for --spawn')
+    p_run.add_argument('--mix', default='cashier=4,owner=2,visitor=12',
+                       help='virtual users per scenario')
+    p_run.add_argument('--duration', type=float, default=30, help='seconds')
+    p_run.add_argument('--think', type=float, default=0.0,
+                       help='mean think time between a user\'s requests (seconds)')
+    p_run.add_argument('--seed', type=int, default=1)
+    p_run.add_argument('--cashier-user', default='kasir')
+    p_run.add_argument('--owner-user', default='owner')
+    p_run.add_argument('--password', default='password')
+    p_run.add_argument('--out', default=RESULTS_DIR, help='directory for the JSON result')
+    p_run.add_argument('--compare', help='earlier result JSON to diff p95 against')
+    args = parser.parse_args(argv)
+
+    if args.command == 'serve':
+        serve(args)
+        return 0
+
+    proc = None
+    args.server = 'external'
+    if args.spawn:
+        if not args.db:
+            raise SystemExit("--spawn butuh --db")
+        proc, args.url = spawn_server(args.db, args.port, args.spawn)
+        args.server = server_kind(args.spawn)
+    try:
+        result = run_load(args)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_result(result, baseline)
+    print(f"hasil disimpan: {save_result(result, args.out)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""Reports data layer: query count and wall time, old plans vs the new one.
+
+Seeds a dedicated database with a large ``sale`` table (1M rows by
+default, spread over 24 months), rebuilds ``sales_monthly`` and then times
+each plan for building the reports page data:
+
+* orm_scan   - the original reports(): ``Sale.query.all()`` into a revenue
+               map, top-products join over sale twice
+* per_query  - separate aggregate queries (chart range over sale, monthly
+               revenue, top products twice over sale)
+* pxm_join   - one product x month LEFT JOIN over the rollup, folded in Python
+* aggregates - ``load_reports_data()``: GROUP BY month and GROUP BY product
+               LIMIT 10 over the rollup
+
+Every plan reads the stock plan from reorder_plan the same way
+(``load_inventory_report``), so they all do the same work and only the
+sales side differs.
+
+Never point it at the production database; it inserts rows.
+
+    python -m bench.reports_queries --rows 1000000 --db sqlite:////tmp/reports_bench.db
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEED_BATCH = 20000
+
+
+def seed(app_module, rows, products, months):
+    db, Product, Sale = app_module.db, app_module.Product, app_module.Sale
+    db.create_all()
+    have_products = db.session.query(db.func.count(Product.id)).scalar()
+    if have_products < products:
+        db.session.execute(Product.__table__.insert(), [
+            {'name': f'BENCH helm {i}', 'sku': f'BENCH-{i:06d}', 'price': 150000 + i % 50 * 10000,
+             'category': 'bench', 'category_key': 'bench', 'stock': random.randint(0, 200)}
+            for i in range(have_products, products)
+        ])
+        db.session.commit()
+    product_ids = [pid for (pid,) in db.session.query(Product.id)]
+
+    have_sales = db.session.query(db.func.count(Sale.id)).scalar()
+    if have_sales >= rows:
+        return have_sales
+    rng = random.Random(have_sales)
+    start = datetime.utcnow() - timedelta(days=30 * months)
+    span = 30 * months * 86400
+    todo = rows - have_sales
+    while todo > 0:
+        batch = min(SEED_BATCH, todo)
+        payload = []
+        for _ in range(batch):
+            qty = rng.randint(1, 3)
+            payload.append({
+                'product_id': rng.choice(product_ids),
+                'qty': qty,
+                'total': qty * 150000.0,
+                'created_at': start + timedelta(seconds=rng.randrange(span)),
+            })
+        db.session.execute(Sale.__table__.insert(), payload)
+        db.session.commit()
+        todo -= batch
+    app_module.rebuild_sales_rollup()
+    return rows
+
+
+# Semua plan menghasilkan data yang sama (plan stok dari reorder_plan,
+# pendapatan per bulan, grafik, top 10); yang dibandingkan hanya cara
+# mengambil penjualan.
+
+def plan_orm_scan(A):
+    db, Product, Sale = A.db, A.Product, A.Sale
+    inventory_report = A.load_inventory_report()
+
+    revenue_map = defaultdict(float)
+    for s in Sale.query.all():
+        revenue_map[A.bucket_key(s.created_at, 'month')] += s.total or 0
+    sales = sorted(revenue_map.items())
+
+    for _ in range(2):
+        top_products = (
+            db.session.query(Product.name, db.func.sum(Sale.qty))
+            .join(Sale, Sale.product_id == Product.id)
+            .group_by(Product.id).order_by(db.func.sum(Sale.qty).desc()).limit(10).all()
+        )
+    return inventory_report, sales, top_products
+
+
+def plan_per_query(A):
+    db, Product, Sale, SalesRollup = A.db, A.Product, A.Sale, A.SalesRollup
+    inventory_report = A.load_inventory_report()
+    chart = (
+        db.session.query(A.time_bucket('month', Sale.created_at).label('month'),
+                         db.func.sum(Sale.total))
+        .filter(Sale.created_at >= A.period_start('month', A.REPORT_MONTHS - 1))
+        .group_by('month').order_by('month').all()
+    )
+    sales = (
+        db.session.query(SalesRollup.month, db.func.sum(SalesRollup.revenue))
+        .group_by(SalesRollup.month).order_by(SalesRollup.month).all()
+    )
+    for _ in range(2):
+        top_products = (
+            db.session.query(Product.name, db.func.sum(Sale.qty))
+            .join(Sale, Sale.product_id == Product.id)
+            .group_by(Product.id).order_by(db.func.sum(Sale.qty).desc()).limit(10).all()
+        )
+    return inventory_report, sales, chart, top_products
+
+
+def plan_pxm_join(A):
+    """Product x month LEFT JOIN over the rollup, folded in Python."""
+    db, Product, SalesRollup, ReorderPlan = A.db, A.Product, A.SalesRollup, A.ReorderPlan
+    rows = (
+        db.session.query(
+            Product.id, Product.name, Product.sku, Product.price, Product.stock,
+            ReorderPlan.forecast, ReorderPlan.rop, ReorderPlan.eoq, ReorderPlan.status,
+            ReorderPlan.action, ReorderPlan.model,
+            SalesRollup.month, SalesRollup.qty, SalesRollup.revenue
+        )
+        .outerjoin(ReorderPlan, ReorderPlan.product_id == Product.id)
+        .outerjoin(SalesRollup, db.and_(SalesRollup.product_id == Product.id,
+                                         SalesRollup.orders > 0))
+        .order_by(Product.id, SalesRollup.month)
+        .all()
+    )
+    inventory_report = []
+    names = {}
+    revenue_by_month = defaultdict(float)
+    sold = {}
+    for row in rows:
+        if row.id not in names:
+            names[row.id] = row.name
+            inventory_report.append(A.reorder_report_row(row))
+        if row.month is not None:
+            revenue_by_month[row.month] += float(row.revenue or 0)
+            sold[row.id] = sold.get(row.id, 0) + int(row.qty or 0)
+    top = sorted(sold.items(), key=lambda item: (-item[1], item[0]))[:10]
+    return inventory_report, sorted(revenue_by_month.items()), [(names[p], q) for p, q in top]
+
+
+def plan_aggregates(A):
+    return A.load_reports_data()
+
+
+PLANS = {
+    'orm_scan': plan_orm_scan,
+    'per_query': plan_per_query,
+    'pxm_join': plan_pxm_join,
+    'aggregates': plan_aggregates,
+}
+
+
+def measure(A, plan, repeat):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = A.db.engine
+    A.event.listen(engine, 'before_cursor_execute', count)
+    try:
+        best = None
+        for _ in range(repeat):
+            statements.clear()
+            A.db.session.expire_all()
+            t0 = time.perf_counter()
+            plan(A)
+            elapsed = time.perf_counter() - t0
+            best = elapsed if best is None else min(best, elapsed)
+            A.db.session.rollback()
+    finally:
+        A.event.remove(engine, 'before_cursor_execute', count)
+    return best, len(statements)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='sqlite:////tmp/reports_bench.db',
+                        help='database URL to seed and query (default: a scratch SQLite file)')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='sale rows to seed')
+    parser.add_argument('--products', type=int, default=2000)
+    parser.add_argument('--months', type=int, default=24)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per plan, best time is kept')
+    parser.add_argument('--plan', choices=sorted(PLANS), action='append')
+    args = parser.parse_args(argv)
+
+    # config membaca DATABASE_URL saat import, jadi harus di-set sebelum import app
+    os.environ['DATABASE_URL'] = args.db
+    import app as A
+
+    with A.app.app_context():
+        t0 = time.perf_counter()
+        n = seed(A, args.rows, args.products, args.months)
+        print(f"sale rows: {n} (seed {time.perf_counter() - t0:.1f}s)")
+
+        print(f"{'plan':10} {'queries':>7} {'seconds':>9}")
+        for name in args.plan or list(PLANS):
+            elapsed, queries = measure(A, PLANS[name], args.repeat)
+            print(f"{name:10} {queries:>7} {elapsed:>9.3f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
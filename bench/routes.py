@@ -0,0 +1,167 @@
+"""Route benchmark suite with per-route SQL query budgets.
+
+Drives each route through the Flask test client against a scratch
+database and records, per route:
+
+* cold   - first request after the response / user caches are cleared
+* warm   - median of ``--runs`` further requests
+* peak   - peak Python memory allocated during one request (tracemalloc)
+* queries (cold and warm) against the route's budget
+
+The run exits with status 1 when any route issues more queries than its
+budget, so an N+1 regression fails CI. ``--generate`` fills an empty
+database first with ``flask datagen``.
+
+    python -m bench.routes --db sqlite:////tmp/routes_bench.db --generate \\
+        --products 10000 --sales 1000000 --json bench_routes.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (nama, path, login sebagai, budget query per request)
+ROUTES = [
+    ('dashboard', '/dashboard', 'owner', 10),
+    ('reports', '/reports', 'owner', 6),
+    ('sales', '/sales', 'kasir', 4),
+    ('returns', '/returns', 'kasir', 4),
+    ('products', '/products', 'kasir', 3),
+    ('products_search', '/products?search=helm', 'kasir', 3),
+    ('category_page', '/category/Semua', None, 2),
+    ('category_filter', '/category/Full Face', None, 2),
+    ('category_search', '/category/Semua?q=kyt', None, 2),
+    ('api_products', '/api/products?limit=500', None, 2),
+    ('api_reorder', '/api/reorder?status=danger', 'owner', 3),
+]
+
+
+class QueryCounter:
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def login(app, username):
+    client = app.test_client()
+    if username:
+        resp = client.post('/login', data={'username': username, 'password': 'password'})
+        if resp.status_code != 302:
+            raise SystemExit(f"login {username} gagal ({resp.status_code})")
+    return client
+
+
+def measure(A, client, path, runs, counter):
+    def hit():
+        counter.count = 0
+        t0 = time.perf_counter()
+        resp = client.get(path)
+        elapsed = time.perf_counter() - t0
+        if resp.status_code != 200:
+            raise SystemExit(f"{path}: HTTP {resp.status_code}")
+        return elapsed, counter.count
+
+    A.response_cache.clear()
+    A.user_cache.clear()
+    cold, cold_queries = hit()
+
+    warm = []
+    warm_queries = 0
+    for _ in range(runs):
+        elapsed, warm_queries = hit()
+        warm.append(elapsed)
+
+    tracemalloc.start()
+    hit()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'cold_ms': cold * 1000,
+        'warm_ms': statistics.median(warm) * 1000 if warm else None,
+        'peak_kb': peak / 1024,
+        'cold_queries': cold_queries,
+        'warm_queries': warm_queries,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='sqlite:////tmp/routes_bench.db',
+                        help='database URL (default: a scratch SQLite file)')
+    parser.add_argument('--generate', action='store_true',
+                        help='run `flask datagen` first when the catalog is smaller than --products')
+    parser.add_argument('--products', type=int, default=10000)
+    parser.add_argument('--sales', type=int, default=1000000)
+    parser.add_argument('--runs', type=int, default=5, help='warm requests per route')
+    parser.add_argument('--route', action='append', help='only these route names')
+    parser.add_argument('--json', help='append the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    # config membaca DATABASE_URL saat import, jadi harus di-set sebelum import app
+    os.environ['DATABASE_URL'] = args.db
+    import app as A
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    app = A.app
+    with app.app_context():
+        A.init_db()
+        have = A.db.session.query(A.db.func.count(A.Product.id)).scalar()
+    if args.generate and have < args.products:
+        result = app.test_cli_runner().invoke(args=[
+            'datagen', '--products', str(args.products - have),
+            '--sales', str(args.sales), '--yes'])
+        print(result.output.strip().splitlines()[-1] if result.output else result)
+
+    clients = {}
+    counter = QueryCounter()
+    event.listen(Engine, 'before_cursor_execute', counter)
+    rows = []
+    failed = []
+    try:
+        print(f"{'route':18} {'cold ms':>9} {'warm ms':>9} {'peak KB':>9} "
+              f"{'q cold':>6} {'q warm':>6} {'budget':>6}")
+        for name, path, user, budget in ROUTES:
+            if args.route and name not in args.route:
+                continue
+            if user not in clients:
+                clients[user] = login(app, user)
+            r = measure(A, clients[user], path, args.runs, counter)
+            over = max(r['cold_queries'], r['warm_queries']) > budget
+            if over:
+                failed.append(name)
+            rows.append({'route': name, 'path': path, 'budget': budget, **r})
+            print(f"{name:18} {r['cold_ms']:>9.1f} {r['warm_ms'] or 0:>9.1f} {r['peak_kb']:>9.0f} "
+                  f"{r['cold_queries']:>6} {r['warm_queries']:>6} {budget:>6}"
+                  f"{'  OVER BUDGET' if over else ''}")
+    finally:
+        event.remove(Engine, 'before_cursor_execute', counter)
+
+    if args.json:
+        history = []
+        if os.path.exists(args.json):
+            with open(args.json, encoding='utf-8') as f:
+                history = json.load(f)
+        history.append({'at': datetime.utcnow().isoformat(timespec='seconds'),
+                        'db': args.db.split('://', 1)[0], 'routes': rows})
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(history, f, indent=2)
+
+    if failed:
+        print(f"melebihi budget query: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
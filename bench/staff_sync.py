@@ -0,0 +1,100 @@
+"""Staff -> User account sync check.
+
+Exercises every path that creates, changes or removes a staff member on a
+scratch database and checks the linked login (``User.staff_id``) after
+each step:
+
+* add       - ORM insert creates the user with the derived username
+* role      - role change is copied to the user
+* rename    - the username follows the new name
+* delete    - the user is removed, so no login with the default password remains
+* import    - ``import_staff`` rows are linked to their staff ids
+* backfill  - ``link_staff_users`` links accounts made before staff_id existed
+
+Exits with status 1 when any check fails.
+
+    python -m bench.staff_sync --db sqlite:////tmp/staff_sync.db
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', default='sqlite:////tmp/staff_sync.db',
+                        help='database URL (default: a scratch SQLite file; tables are dropped)')
+    args = parser.parse_args(argv)
+
+    # config membaca DATABASE_URL saat import, jadi harus di-set sebelum import app
+    os.environ['DATABASE_URL'] = args.db
+    import app as A
+
+    db, Staff, User = A.db, A.Staff, A.User
+    failed = []
+
+    def check(name, ok, detail=''):
+        print(f"{name:10} {'ok' if ok else 'GAGAL'} {detail}")
+        if not ok:
+            failed.append(name)
+
+    def user_of(staff_id):
+        db.session.expire_all()
+        return User.query.filter_by(staff_id=staff_id).all()
+
+    with A.app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        s = Staff(name='Budi Santoso', role='kasir', email='budi@example.com')
+        db.session.add(s)
+        db.session.commit()
+        users = user_of(s.id)
+        check('add', [(u.username, u.role) for u in users] == [('budisantoso', 'kasir')],
+              [(u.username, u.role) for u in users])
+
+        s.role = 'marketing'
+        db.session.commit()
+        users = user_of(s.id)
+        check('role', [u.role for u in users] == ['marketing'], [u.role for u in users])
+
+        s.name = 'Budi S'
+        db.session.commit()
+        users = user_of(s.id)
+        check('rename', [u.username for u in users] == ['budis'], [u.username for u in users])
+
+        staff_id = s.id
+        db.session.delete(s)
+        db.session.commit()
+        left = User.query.filter(db.or_(User.staff_id == staff_id,
+                                        User.username.in_(['budis', 'budisantoso']))).count()
+        check('delete', left == 0, f"{left} akun tersisa")
+
+        inserted, errors = A.import_staff([
+            {'name': 'Sari Dewi', 'role': 'kasir'},
+            {'name': 'Andi', 'role': 'owner', 'email': 'andi@example.com'},
+        ])
+        staff = {st.name: st.id for st in Staff.query}
+        linked = {u.username: u.staff_id for u in User.query.filter(User.staff_id.isnot(None))}
+        check('import', inserted == 2 and not errors
+              and linked == {'saridewi': staff['Sari Dewi'], 'andi': staff['Andi']}, linked)
+
+        db.session.query(User).update({User.staff_id: None})
+        db.session.add(User(username='owner', password='password', role='owner'))
+        db.session.commit()
+        n = A.link_staff_users()
+        db.session.commit()
+        linked = {u.username: u.staff_id for u in User.query}
+        check('backfill', n == 2 and linked == {'saridewi': staff['Sari Dewi'],
+                                                'andi': staff['Andi'], 'owner': None}, linked)
+
+    if failed:
+        print(f"gagal: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
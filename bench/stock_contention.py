@@ -0,0 +1,181 @@
+"""Multi-threaded stock contention load test.
+
+Runs the same burst of concurrent sales against one product with three
+stock-movement strategies and checks the books afterwards:
+
+* naive       - the old read / check / ``p.stock -= qty`` in Python
+* for_update  - ``SELECT ... FOR UPDATE`` then write
+* atomic      - ``record_sale()``: one conditional UPDATE + rowcount check
+
+Meant to run against the real MySQL/MariaDB database from config. On
+SQLite ``FOR UPDATE`` is a no-op: ``for_update`` still runs as the
+throughput baseline, but its consistency column is meaningless there.
+
+The exit status only reflects the ``atomic`` strategy (the one the app
+uses): 1 when its books don't add up. ``naive`` is expected to lose
+updates. The table reports each strategy's throughput relative to naive
+and to the ``for_update`` baseline.
+
+    python -m bench.stock_contention --threads 16 --sales 4000
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app import app, db, Product, Sale, SalesRollup, record_sale, bump_sales_rollup  # noqa: E402
+
+
+def sell_naive(pid, qty):
+    p = db.session.get(Product, pid, populate_existing=True)
+    if p.stock < qty:
+        db.session.rollback()
+        return False
+    p.stock -= qty
+    db.session.add(Sale(product_id=pid, qty=qty, total=p.price * qty, created_at=datetime.utcnow()))
+    bump_sales_rollup(pid, datetime.utcnow(), qty=qty, revenue=p.price * qty, orders=1)
+    db.session.commit()
+    return True
+
+
+def sell_for_update(pid, qty):
+    p = (
+        db.session.query(Product)
+        .filter_by(id=pid)
+        .populate_existing()
+        .with_for_update()
+        .one()
+    )
+    if p.stock < qty:
+        db.session.rollback()
+        return False
+    p.stock -= qty
+    db.session.add(Sale(product_id=pid, qty=qty, total=p.price * qty, created_at=datetime.utcnow()))
+    bump_sales_rollup(pid, datetime.utcnow(), qty=qty, revenue=p.price * qty, orders=1)
+    db.session.commit()
+    return True
+
+
+def sell_atomic(pid, qty):
+    price = db.session.query(Product.price).filter_by(id=pid).scalar()
+    if record_sale(pid, qty, datetime.utcnow(), price) is None:
+        db.session.rollback()
+        return False
+    db.session.commit()
+    return True
+
+
+STRATEGIES = {
+    'naive': sell_naive,
+    'for_update': sell_for_update,
+    'atomic': sell_atomic,
+}
+
+
+def run(strategy, threads, attempts, initial_stock):
+    with app.app_context():
+        p = Product(name=f'BENCH stock {strategy}', price=1000, stock=initial_stock)
+        db.session.add(p)
+        db.session.commit()
+        pid = p.id
+
+    sell = STRATEGIES[strategy]
+    counts = {'ok': 0, 'rejected': 0, 'errors': 0}
+    lock = threading.Lock()
+    per_thread = attempts // threads
+    start = threading.Barrier(threads + 1)
+
+    def worker():
+        ok = rejected = errors = 0
+        with app.app_context():
+            start.wait()
+            for _ in range(per_thread):
+                try:
+                    if sell(pid, 1):
+                        ok += 1
+                    else:
+                        rejected += 1
+                except OperationalError:
+                    db.session.rollback()
+                    errors += 1
+        with lock:
+            counts['ok'] += ok
+            counts['rejected'] += rejected
+            counts['errors'] += errors
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for t in pool:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    with app.app_context():
+        stock = db.session.query(Product.stock).filter_by(id=pid).scalar()
+        sold = db.session.query(db.func.coalesce(db.func.sum(Sale.qty), 0)).filter_by(product_id=pid).scalar()
+        db.session.query(Sale).filter_by(product_id=pid).delete()
+        db.session.query(SalesRollup).filter_by(product_id=pid).delete()
+        db.session.query(Product).filter_by(id=pid).delete()
+        db.session.commit()
+
+    consistent = stock >= 0 and stock + sold == initial_stock and sold == counts['ok']
+    return {
+        'strategy': strategy,
+        'elapsed': elapsed,
+        'sales_per_sec': counts['ok'] / elapsed if elapsed else 0.0,
+        'final_stock': stock,
+        'sold': sold,
+        'consistent': consistent,
+        **counts,
+    }
+
+
+def relative(result, base):
+    if base is None or base is result or not base['sales_per_sec']:
+        return '-'
+    return f"{(result['sales_per_sec'] / base['sales_per_sec'] - 1) * 100:+.0f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--sales', type=int, default=2000, help='total sale attempts per strategy')
+    parser.add_argument('--stock', type=int, default=None,
+                        help='initial stock (default: half the attempts, so some sales are rejected)')
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), action='append')
+    args = parser.parse_args(argv)
+
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    initial_stock = args.stock if args.stock is not None else args.sales // 2
+    results = {}
+    print(f"database: {dialect}")
+    print(f"{'strategy':12} {'ok':>6} {'rejected':>8} {'errors':>6} {'stock':>6} {'sales/s':>9} "
+          f"{'vs naive':>9} {'vs f_upd':>9}  consistent")
+    for strategy in args.strategy or ['naive', 'for_update', 'atomic']:
+        r = results[strategy] = run(strategy, args.threads, args.sales, initial_stock)
+        consistent = 'yes' if r['consistent'] else 'NO'
+        if strategy == 'for_update' and dialect == 'sqlite':
+            consistent = 'n/a (SQLite ignores FOR UPDATE)'
+        print(f"{r['strategy']:12} {r['ok']:>6} {r['rejected']:>8} {r['errors']:>6} "
+              f"{r['final_stock']:>6} {r['sales_per_sec']:>9.1f} "
+              f"{relative(r, results.get('naive')):>9} {relative(r, results.get('for_update')):>9}  "
+              f"{consistent}")
+
+    atomic = results.get('atomic')
+    if atomic is not None and not atomic['consistent']:
+        print("atomic: stok dan penjualan tidak cocok")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
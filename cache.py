@@ -0,0 +1,126 @@
+"""Caches shared by the app: in-process TTL/LRU and the response cache backends."""
+import pickle
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl`` seconds.
+
+    This lives per worker process: invalidating a key only affects the
+    process that does it, the TTL bounds how stale the other workers get.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CacheBackend(ABC):
+    """Interface for the response / fragment cache.
+
+    Values must be picklable so a shared backend (Redis or a local
+    stand-in) can hold them. ``get`` returns None on a miss.
+    """
+
+    @abstractmethod
+    def get(self, key):
+        """Cached value for ``key``, or None."""
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        """Store ``value``; ``ttl`` seconds overrides the backend default."""
+
+    @abstractmethod
+    def delete(self, key):
+        """Drop ``key`` if present."""
+
+    @abstractmethod
+    def clear(self):
+        """Drop every entry of this cache."""
+
+
+class LocalCache(CacheBackend):
+    """In-process LRU backend (default)."""
+
+    def __init__(self, maxsize=256, ttl=300):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value, ttl=None):
+        self._cache.set(key, value)
+
+    def delete(self, key):
+        self._cache.delete(key)
+
+    def clear(self):
+        self._cache.clear()
+
+
+class RedisCache(CacheBackend):
+    """Backend for any client with Redis-style get / set(ex=) / delete."""
+
+    def __init__(self, client, ttl=300, prefix="dunia_helm:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(value), ex=ttl or self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+def make_cache(url="local", maxsize=256, ttl=300):
+    """Build a cache backend from a URL: "local" or "redis://host:port/db"."""
+    if not url or url == "local":
+        return LocalCache(maxsize=maxsize, ttl=ttl)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        import redis  # optional, only needed for a shared cache
+        return RedisCache(redis.Redis.from_url(url), ttl=ttl)
+    raise ValueError(f"Unknown cache backend: {url}")
@@ -1,12 +1,80 @@
 import os
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def engine_options(url):
+    """SQLAlchemy engine options for ``url``, tunable from the environment.
+
+    Pool sizing only applies to server databases; SQLite keeps its defaults.
+    """
+    options = {"pool_pre_ping": env_bool("DB_POOL_PRE_PING", True)}
+    if url.startswith("sqlite"):
+        return options
+    options.update(
+        pool_size=int(os.environ.get("DB_POOL_SIZE", 10)),
+        max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+        pool_timeout=int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        # di bawah wait_timeout MySQL, supaya koneksi idle tidak basi
+        pool_recycle=int(os.environ.get("DB_POOL_RECYCLE", 280)),
+    )
+    if url.startswith("mysql"):
+        options["connect_args"] = {
+            "connect_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT", 5)),
+            "read_timeout": int(os.environ.get("DB_READ_TIMEOUT", 30)),
+            "write_timeout": int(os.environ.get("DB_WRITE_TIMEOUT", 30)),
+        }
+    return options
+
+def replica_binds(url):
+    if not url:
+        return {}
+    return {"replica": {"url": url, **engine_options(url)}}
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-secret-key")
-    SQLALCHEMY_DATABASE_URI = "mysql+pymysql://root:@localhost/dunia_helm"
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "mysql+pymysql://root:@localhost/dunia_helm")
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # read replica opsional; view yang berat baca otomatis diarahkan ke sini
+    SQLALCHEMY_BINDS = replica_binds(os.environ.get("DATABASE_REPLICA_URL"))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # "local" (LRU per proses) atau redis://host:port/db
+    RESPONSE_CACHE_URL = os.environ.get("RESPONSE_CACHE_URL", "local")
+    RESPONSE_CACHE_SIZE = 256
+    RESPONSE_CACHE_TTL = 300
+    # refresh penuh reorder_plan tiap N detik di proses web; 0 = mati (pakai cron + `flask reorder-refresh`)
+    REORDER_REFRESH_SECONDS = int(os.environ.get("REORDER_REFRESH_SECONDS", 0))
+    # alert stok rendah: webhook opsional, jeda kumpulkan burst, jeda alert ulang per produk
+    ALERT_WEBHOOK_URL = os.environ.get("ALERT_WEBHOOK_URL", "")
+    ALERT_DEBOUNCE_SECONDS = float(os.environ.get("ALERT_DEBOUNCE_SECONDS", 5))
+    ALERT_COOLDOWN_SECONDS = int(os.environ.get("ALERT_COOLDOWN_SECONDS", 3600))
+    # logging & instrumentasi; LOG_LEVEL=DEBUG juga mencatat setiap request
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+    SLOW_QUERY_SECONDS = float(os.environ.get("SLOW_QUERY_SECONDS", 0.2))
+    SLOW_REQUEST_SECONDS = float(os.environ.get("SLOW_REQUEST_SECONDS", 1.0))
+    # kosong = /metrics terbuka; isi untuk mewajibkan "Authorization: Bearer <token>"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
 
 LEAD_TIME_DAYS = 4
 WORKING_DAYS = 30
 ORDER_COST = 50000
-HOLDING_RATE = 0.1
\ No newline at end of file
+HOLDING_RATE = 0.1
+REPORT_MONTHS = 12  # jendela chart pendapatan di /reports
+FORECAST_HOLDOUT_MONTHS = 3  # bulan terakhir yang dipakai backtest model forecast
+
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 500
+STOREFRONT_PAGE_SIZE = 24
+DASHBOARD_REORDER_ITEMS = 5
+HISTORY_PAGE_SIZE = 50  # riwayat penjualan / retur per halaman
+NOTIFICATION_PAGE_SIZE = 50
+PROFILE_KEEP = 50  # file profil developer yang disimpan
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s %(message)s"
+
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 60  # detik
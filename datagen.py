@@ -0,0 +1,167 @@
+"""Synthetic catalog and sales history for load / scale testing.
+
+Produces a catalog across the storefront categories and years of sales
+with realistic shape:
+
+* popularity follows a Zipf curve, so a few SKUs sell most of the volume
+  and the long tail (mostly accessories) sells intermittently;
+* a yearly season peaking around December, a smaller mid-year bump,
+  payday spikes at the turn of the month, busier weekends and a mild
+  year-on-year growth trend;
+* a share of sales come back as returns a few days later.
+
+Everything is inserted with executemany in batches. Run through
+``flask datagen``, never against production data.
+"""
+import math
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+CATEGORIES = {
+    # kategori: (bobot jumlah produk, harga min, harga max)
+    'Full Face': (0.25, 450_000, 2_500_000),
+    'Half Face': (0.25, 150_000, 900_000),
+    'Wanita': (0.10, 150_000, 800_000),
+    'New Arrival': (0.10, 300_000, 2_000_000),
+    'Aksesoris': (0.30, 15_000, 350_000),
+}
+BRANDS = ('KYT', 'INK', 'NHK', 'MDS', 'GM', 'Zeus', 'Cargloss', 'BMC', 'Nolan', 'LS2')
+MODELS = ('Rc7', 'Centro', 'Kyoto', 'Vendetta', 'Flux', 'Neo', 'Duke', 'Rider', 'Ares', 'Pro')
+ACCESSORIES = ('Visor Clear', 'Visor Dark', 'Busa Helm', 'Pinlock', 'Kaca Iridium', 'Tas Helm',
+               'Kunci Helm', 'Intercom', 'Spoiler', 'Tali Dagu')
+RETURN_REASONS = ('Ukuran tidak pas', 'Cacat produksi', 'Salah warna', 'Berubah pikiran')
+
+BATCH = 50_000
+ZIPF_EXPONENT = 1.1
+GROWTH_PER_YEAR = 0.1
+
+
+def product_rows(n, rng, start=0):
+    """``n`` product dicts (for a Core insert; category_key filled in)."""
+    names = list(CATEGORIES)
+    weights = np.array([CATEGORIES[c][0] for c in names])
+    cats = rng.choice(len(names), size=n, p=weights / weights.sum())
+    rows = []
+    for i in range(n):
+        category = names[cats[i]]
+        _, low, high = CATEGORIES[category]
+        if category == 'Aksesoris':
+            name = f"{ACCESSORIES[rng.integers(len(ACCESSORIES))]} {BRANDS[rng.integers(len(BRANDS))]}"
+        else:
+            name = f"Helm {BRANDS[rng.integers(len(BRANDS))]} {MODELS[rng.integers(len(MODELS))]} {category}"
+        price = round(float(rng.uniform(low, high)), -3)
+        rows.append({
+            'name': f"{name} #{start + i + 1}",
+            'sku': f"GEN-{start + i + 1:07d}",
+            'price': price,
+            'category': category,
+            'category_key': category.lower(),
+            # sebagian stok dibuat tipis supaya ada produk "Bahaya"
+            'stock': int(rng.integers(0, 8) if rng.random() < 0.15 else rng.integers(10, 200)),
+            'description': f"Produk sintetis {category.lower()}",
+        })
+    return rows
+
+
+def day_weights(start, days):
+    """Relative sales volume of each day from ``start``."""
+    out = np.empty(days)
+    for d in range(days):
+        day = start + timedelta(days=d)
+        year_pos = (day.timetuple().tm_yday - 350) / 365.25 * 2 * math.pi
+        season = 1 + 0.35 * math.cos(year_pos) + 0.15 * math.cos(2 * year_pos)
+        payday = 1.3 if day.day >= 25 or day.day <= 3 else 1.0
+        weekend = 1.25 if day.weekday() >= 5 else 1.0
+        growth = (1 + GROWTH_PER_YEAR) ** (d / 365.25)
+        out[d] = season * payday * weekend * growth
+    return out
+
+
+def sale_batches(product_ids, prices, n, years, rng, today=None, batch=BATCH):
+    """Yield lists of sale dicts, ``n`` rows in total over the last ``years`` years."""
+    today = today or date.today()
+    days = int(years * 365)
+    start = today - timedelta(days=days - 1)
+    weights = day_weights(start, days)
+    day_p = weights / weights.sum()
+
+    ranks = rng.permutation(len(product_ids)) + 1
+    popularity = 1.0 / ranks ** ZIPF_EXPONENT
+    product_p = popularity / popularity.sum()
+    prices = np.asarray(prices, dtype=np.float64)
+    start_dt = datetime(start.year, start.month, start.day)
+
+    done = 0
+    while done < n:
+        size = min(batch, n - done)
+        day = rng.choice(days, size=size, p=day_p)
+        seconds = rng.integers(9 * 3600, 21 * 3600, size=size)
+        idx = rng.choice(len(product_ids), size=size, p=product_p)
+        qty = rng.choice([1, 1, 1, 1, 2, 2, 3], size=size)
+        yield [
+            {
+                'product_id': int(product_ids[idx[k]]),
+                'qty': int(qty[k]),
+                'total': float(prices[idx[k]] * qty[k]),
+                'created_at': start_dt + timedelta(days=int(day[k]), seconds=int(seconds[k])),
+            }
+            for k in range(size)
+        ]
+        done += size
+
+
+def return_rows(sales, rate, rng, today=None):
+    """Returns for roughly ``rate`` of ``sales``, 1-14 days after each sale."""
+    now = datetime.combine(today or date.today(), datetime.max.time())
+    rows = []
+    for sale in sales:
+        if rng.random() >= rate:
+            continue
+        created_at = sale['created_at'] + timedelta(days=int(rng.integers(1, 15)))
+        if created_at > now:
+            continue
+        rows.append({
+            'product_id': sale['product_id'],
+            'qty': 1,
+            'reason': RETURN_REASONS[rng.integers(len(RETURN_REASONS))],
+            'created_at': created_at,
+        })
+    return rows
+
+
+def generate(session, product_table, sale_table, return_table, products, sales,
+             return_rate=0.02, years=2, seed=42, progress=None):
+    """Insert ``products`` products and ``sales`` sales (plus returns).
+
+    Returns (products, sales, returns) inserted. The caller rebuilds
+    derived tables (rollup, search index, reorder plan) afterwards.
+    """
+    rng = np.random.default_rng(seed)
+    start = session.execute(product_table.select().with_only_columns(
+        product_table.c.id).order_by(product_table.c.id.desc()).limit(1)).scalar() or 0
+
+    for i in range(0, products, BATCH):
+        session.execute(product_table.insert(),
+                        product_rows(min(BATCH, products - i), rng, start=start + i))
+    session.commit()
+
+    catalog = session.execute(
+        product_table.select().with_only_columns(product_table.c.id, product_table.c.price)
+    ).all()
+    product_ids = [pid for pid, _ in catalog]
+    prices = [price for _, price in catalog]
+
+    inserted_sales = inserted_returns = 0
+    if product_ids:
+        for rows in sale_batches(product_ids, prices, sales, years, rng):
+            session.execute(sale_table.insert(), rows)
+            returns = return_rows(rows, return_rate, rng)
+            if returns:
+                session.execute(return_table.insert(), returns)
+            session.commit()
+            inserted_sales += len(rows)
+            inserted_returns += len(returns)
+            if progress:
+                progress(inserted_sales, sales)
+    return products, inserted_sales, inserted_returns
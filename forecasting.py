@@ -0,0 +1,201 @@
+"""Demand forecasting: pluggable models and per-SKU model selection.
+
+Semua model bekerja di atas matriks (produk x bulan) rata kiri: baris i
+berisi qty bulanan produk i mulai dari bulan penjualan pertamanya sampai
+bulan berjalan, bulan tanpa penjualan diisi 0, dan ``lengths[i]`` adalah
+jumlah sel yang berisi data. Setiap model meramal ``horizon`` bulan ke
+depan untuk semua produk sekaligus, satu langkah NumPy per bulan.
+
+``select_models`` menjalankan backtest: tiap model dilatih tanpa
+``holdout`` bulan terakhir, diukur MAE-nya pada bulan-bulan itu, lalu
+model dengan error terkecil dipakai untuk ramalan bulan depan produk itu.
+Model baru cukup didaftarkan dengan ``@model('nama')``.
+"""
+import numpy as np
+
+from planning import ses_last
+
+ALPHA_GRID = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+HOLT_ALPHA = 0.3
+HOLT_BETA = 0.1
+MA_WINDOW = 3
+CROSTON_ALPHA = 0.1
+DEFAULT_MODEL = 'ses'
+MIN_TRAIN = 2  # bulan minimal untuk melatih model dalam backtest
+
+MODELS = {}
+
+
+def model(name):
+    """Register ``fn(matrix, lengths, horizon)`` as a forecasting model."""
+    def register(fn):
+        MODELS[name] = fn
+        return fn
+    return register
+
+
+def month_index(month):
+    year, mon = month.split('-')
+    return int(year) * 12 + int(mon) - 1
+
+
+def series_matrix(product_ids, demand, last_month):
+    """Zero-filled, left-aligned monthly series for ``product_ids``.
+
+    ``demand`` yields (product_id, 'YYYY-MM', qty) for months with sales.
+    Each row runs from the product's first sale month to ``last_month``;
+    products without sales get length 0. Returns (matrix, lengths).
+    """
+    pos = {pid: i for i, pid in enumerate(product_ids)}
+    end = month_index(last_month)
+    rows, months, qtys = [], [], []
+    for pid, month, qty in demand:
+        i = pos.get(pid)
+        m = month_index(month)
+        if i is None or m > end:
+            continue
+        rows.append(i)
+        months.append(m)
+        qtys.append(float(qty or 0))
+
+    rows = np.array(rows, dtype=np.int64)
+    months = np.array(months, dtype=np.int64)
+    first = np.full(len(product_ids), end + 1, dtype=np.int64)
+    np.minimum.at(first, rows, months)
+    lengths = np.where(first <= end, end - first + 1, 0)
+
+    width = int(lengths.max()) if len(product_ids) else 0
+    matrix = np.zeros((len(product_ids), max(width, 1)), dtype=np.float64)
+    np.add.at(matrix, (rows, months - first[rows]), np.array(qtys, dtype=np.float64))
+    return matrix, lengths
+
+
+def flat(level, horizon):
+    return np.repeat(level[:, None], horizon, axis=1)
+
+
+def tune_alpha(matrix, lengths, grid=ALPHA_GRID):
+    """Per-row SES alpha from ``grid`` with the lowest one-step-ahead SSE."""
+    alphas = np.asarray(grid, dtype=np.float64)[:, None]
+    level = np.repeat(matrix[None, :, 0], len(grid), axis=0)
+    sse = np.zeros_like(level)
+    for j in range(1, matrix.shape[1]):
+        active = lengths > j
+        x = matrix[:, j]
+        sse += np.where(active, (x - level) ** 2, 0.0)
+        level = np.where(active, alphas * x + (1 - alphas) * level, level)
+    return alphas[np.argmin(sse, axis=0), 0]
+
+
+@model('ses')
+def ses(matrix, lengths, horizon=1):
+    """Simple exponential smoothing with alpha tuned per product."""
+    return flat(ses_last(matrix, lengths, tune_alpha(matrix, lengths)), horizon)
+
+
+@model('holt')
+def holt(matrix, lengths, horizon=1, alpha=HOLT_ALPHA, beta=HOLT_BETA):
+    """Holt's linear trend; forecasts are floored at zero."""
+    level = matrix[:, 0].copy()
+    if matrix.shape[1] > 1:
+        trend = np.where(lengths > 1, matrix[:, 1] - matrix[:, 0], 0.0)
+    else:
+        trend = np.zeros_like(level)
+    for j in range(1, matrix.shape[1]):
+        active = lengths > j
+        new_level = alpha * matrix[:, j] + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+    steps = np.arange(1, horizon + 1, dtype=np.float64)
+    return np.maximum(level[:, None] + trend[:, None] * steps, 0.0)
+
+
+@model('moving_average')
+def moving_average(matrix, lengths, horizon=1, window=MA_WINDOW):
+    """Mean of the last ``window`` months (fewer if the history is shorter)."""
+    csum = np.concatenate([np.zeros((matrix.shape[0], 1)), np.cumsum(matrix, axis=1)], axis=1)
+    n = np.minimum(lengths, window)
+    rows = np.arange(matrix.shape[0])
+    total = csum[rows, lengths] - csum[rows, lengths - n]
+    level = np.divide(total, n, out=np.zeros(matrix.shape[0]), where=n > 0)
+    return flat(level, horizon)
+
+
+@model('croston')
+def croston(matrix, lengths, horizon=1, alpha=CROSTON_ALPHA):
+    """Croston's method for intermittent demand: smoothed size / smoothed interval."""
+    size = np.zeros(matrix.shape[0])
+    interval = np.zeros(matrix.shape[0])
+    since = np.ones(matrix.shape[0])
+    started = np.zeros(matrix.shape[0], dtype=bool)
+    for j in range(matrix.shape[1]):
+        active = lengths > j
+        x = matrix[:, j]
+        demand = active & (x > 0)
+        first = demand & ~started
+        again = demand & started
+        size = np.where(first, x, np.where(again, alpha * x + (1 - alpha) * size, size))
+        interval = np.where(first, since,
+                            np.where(again, alpha * since + (1 - alpha) * interval, interval))
+        started |= demand
+        since = np.where(demand, 1.0, np.where(active, since + 1, since))
+    level = np.divide(size, interval, out=np.zeros_like(size), where=interval > 0)
+    return flat(level, horizon)
+
+
+def backtest(matrix, lengths, holdout=3, models=None):
+    """MAE of each model over every product's last ``holdout`` months.
+
+    Returns (names, errors) where errors is (products x models); rows with
+    fewer than ``MIN_TRAIN`` months before the holdout are NaN.
+    """
+    names = list(models or MODELS)
+    train = np.maximum(lengths - holdout, 0)
+    scored = (lengths - holdout) >= MIN_TRAIN
+    cols = np.clip(train[:, None] + np.arange(holdout), 0, matrix.shape[1] - 1)
+    actual = np.take_along_axis(matrix, cols, axis=1)
+
+    errors = np.full((matrix.shape[0], len(names)), np.nan)
+    for k, name in enumerate(names):
+        predicted = MODELS[name](matrix, train, horizon=holdout)
+        errors[:, k] = np.where(scored, np.abs(predicted - actual).mean(axis=1), np.nan)
+    return names, errors
+
+
+def select_models(matrix, lengths, holdout=3, models=None, default=DEFAULT_MODEL):
+    """Backtest, pick the best model per product and forecast next month.
+
+    Products too short to backtest use ``default``. Returns
+    (forecast, model names per product, backtest MAE or NaN).
+    """
+    names, errors = backtest(matrix, lengths, holdout, models)
+    scored = ~np.isnan(errors).all(axis=1)
+    best = np.where(scored, np.argmin(np.where(np.isnan(errors), np.inf, errors), axis=1),
+                    names.index(default))
+
+    forecast = np.zeros(matrix.shape[0])
+    for k, name in enumerate(names):
+        rows = best == k
+        if rows.any():
+            forecast[rows] = MODELS[name](matrix[rows], lengths[rows], horizon=1)[:, 0]
+    # buang noise float (mis. 2.0000000001) sebelum di-ceil oleh planner
+    forecast = np.round(forecast, 9)
+
+    mae = np.where(scored, errors[np.arange(len(best)), best], np.nan)
+    return forecast, [names[k] for k in best], mae
+
+
+def backtest_summary(matrix, lengths, holdout=3):
+    """Per-model (name, wins, mean MAE) plus scored count and the selected mean MAE."""
+    names, errors = backtest(matrix, lengths, holdout)
+    scored = ~np.isnan(errors).all(axis=1)
+    if not scored.any():
+        return [(name, 0, float('nan')) for name in names], 0, float('nan')
+    best = np.argmin(np.where(np.isnan(errors), np.inf, errors), axis=1)[scored]
+    summary = [
+        (name, int((best == k).sum()), float(errors[scored, k].mean()))
+        for k, name in enumerate(names)
+    ]
+    overall = float(errors[scored][np.arange(len(best)), best].mean())
+    return summary, int(scored.sum()), overall
@@ -0,0 +1,147 @@
+"""Product image pipeline.
+
+Uploads are stored under a content-hash filename (identical uploads are
+stored once) and resized in a background thread pool into thumb / medium /
+full variants, each as WebP plus a JPEG (or PNG, for transparent images)
+fallback:
+
+    <hash>.<ext>               original, returned right away
+    <hash>-thumb.webp / .jpg   320px
+    <hash>-medium.webp / .jpg  800px
+    <hash>-full.webp / .jpg    1600px
+
+Variants are never upscaled, so a small upload has narrower (or equal)
+variants than these nominal sizes; ``srcset`` advertises the real widths.
+"""
+import hashlib
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+log = logging.getLogger(__name__)
+
+VARIANTS = {'thumb': 320, 'medium': 800, 'full': 1600}
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+HASH_NAME = re.compile(r'^([0-9a-f]{20})\.\w+$')
+
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='images')
+# hash -> ekstensi fallback ('jpg' / 'png') untuk gambar yang variannya sudah jadi
+_ready = {}
+# hash -> {varian: lebar sebenarnya}
+_widths = {}
+
+
+def content_name(data, filename):
+    ext = filename.rsplit('.', 1)[-1].lower() if '.' in filename else 'jpg'
+    if ext == 'jpeg':
+        ext = 'jpg'
+    return f"{hashlib.sha256(data).hexdigest()[:20]}.{ext}"
+
+
+def store_upload(file, folder):
+    """Save an uploaded file under its content hash and queue the variants.
+
+    Returns the stored filename. The request never waits for resizing.
+    """
+    data = file.read()
+    name = content_name(data, file.filename or '')
+    path = os.path.join(folder, name)
+    if not os.path.exists(path):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+    if variant_fallback(folder, name) is None:
+        executor.submit(build_variants, folder, name)
+    return name
+
+
+def build_variants(folder, name):
+    """Write every size / format variant of ``name`` (runs in the pool)."""
+    from PIL import Image, ImageOps
+
+    stem = name.rsplit('.', 1)[0]
+    try:
+        with Image.open(os.path.join(folder, name)) as src:
+            img = ImageOps.exif_transpose(src)
+            has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+            fallback = 'png' if has_alpha else 'jpg'
+
+            widths = {}
+            for variant, width in VARIANTS.items():
+                out = img.copy()
+                out.thumbnail((width, width * 2))
+                widths[variant] = out.width
+                out.save(os.path.join(folder, f"{stem}-{variant}.webp"), 'WEBP',
+                         quality=WEBP_QUALITY, method=4)
+                if fallback == 'png':
+                    out.save(os.path.join(folder, f"{stem}-{variant}.png"), 'PNG', optimize=True)
+                else:
+                    out.save(os.path.join(folder, f"{stem}-{variant}.jpg"), 'JPEG',
+                             quality=JPEG_QUALITY, optimize=True, progressive=True)
+    except Exception:
+        log.exception("gagal membuat varian gambar %s", name)
+        return False
+    _widths[stem] = widths
+    _ready[stem] = fallback
+    return True
+
+
+def variant_fallback(folder, name):
+    """Fallback extension of ``name``'s variants, or None if not built yet."""
+    match = HASH_NAME.match(name or '')
+    if not match:
+        return None
+    stem = match.group(1)
+    if stem in _ready:
+        return _ready[stem]
+    for ext in ('jpg', 'png'):
+        if os.path.exists(os.path.join(folder, f"{stem}-full.{ext}")):
+            _ready[stem] = ext
+            return ext
+    return None
+
+
+def variant_name(folder, name, variant, fmt=None):
+    """Filename of a variant, or the original name when none is ready."""
+    fallback = variant_fallback(folder, name)
+    if fallback is None:
+        return name
+    return f"{name.rsplit('.', 1)[0]}-{variant}.{fmt or fallback}"
+
+
+def variant_widths(folder, name):
+    """Actual pixel width of each built variant of ``name`` (read once, then cached)."""
+    fallback = variant_fallback(folder, name)
+    if fallback is None:
+        return {}
+    stem = name.rsplit('.', 1)[0]
+    if stem not in _widths:
+        from PIL import Image
+
+        widths = {}
+        for variant in VARIANTS:
+            # Image.open hanya membaca header, tidak men-decode gambar
+            with Image.open(os.path.join(folder, f"{stem}-{variant}.{fallback}")) as img:
+                widths[variant] = img.width
+        _widths[stem] = widths
+    return _widths[stem]
+
+
+def srcset(folder, name, url, fmt=None):
+    """``srcset`` value with each variant's real width; ``url`` maps a filename to a URL.
+
+    Variants that came out no wider than a smaller one (small uploads are
+    not upscaled) are left out, so no width is advertised twice.
+    """
+    entries = []
+    seen = set()
+    for variant, width in variant_widths(folder, name).items():
+        if width in seen:
+            continue
+        seen.add(width)
+        entries.append(f"{url(variant_name(folder, name, variant, fmt))} {width}w")
+    return ', '.join(entries)
@@ -0,0 +1,177 @@
+"""Request / SQL instrumentation and Prometheus text exposition.
+
+``init_app(app)`` hooks:
+
+* SQLAlchemy ``before/after_cursor_execute`` on every engine (primary and
+  replica): counts statements and DB time for the current request and
+  logs statements slower than ``SLOW_QUERY_SECONDS``, normalized so that
+  the same query with different literals logs identically;
+* Flask ``before/after_request``: wall time per endpoint, plus the SQL
+  counters above, recorded into histograms.
+
+``Metrics.render()`` produces the Prometheus text format served at
+/metrics. Numbers are per worker process (scrape each worker, or sum).
+"""
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+log = logging.getLogger('dunia_helm.request')
+sql_log = logging.getLogger('dunia_helm.sql')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+_STRING = re.compile(r"'(?:''|[^'])*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s|:\w+)\s*,?)+\)", re.I)
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement):
+    """Statement with literals replaced by ``?`` and IN lists collapsed."""
+    sql = _STRING.sub('?', statement)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class Histogram:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class Metrics:
+    """Per-endpoint request metrics, safe to update from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.queries = defaultdict(lambda: Histogram(QUERY_BUCKETS))
+        self.db_seconds = defaultdict(float)
+        self.requests = defaultdict(int)  # (endpoint, status) -> n
+        self.slow_queries = defaultdict(int)
+
+    def record(self, endpoint, status, seconds, queries, db_seconds):
+        with self._lock:
+            self.latency[endpoint].observe(seconds)
+            self.queries[endpoint].observe(queries)
+            self.db_seconds[endpoint] += db_seconds
+            self.requests[(endpoint, status)] += 1
+
+    def record_slow_query(self, endpoint):
+        with self._lock:
+            self.slow_queries[endpoint] += 1
+
+    def render(self):
+        out = []
+        with self._lock:
+            _histogram(out, 'http_request_duration_seconds',
+                       'Request latency in seconds by endpoint.', self.latency)
+            _histogram(out, 'db_queries_per_request',
+                       'SQL statements executed per request by endpoint.', self.queries)
+            out.append('# HELP db_query_seconds_total Time spent in SQL by endpoint.')
+            out.append('# TYPE db_query_seconds_total counter')
+            for endpoint, value in sorted(self.db_seconds.items()):
+                out.append(f'db_query_seconds_total{{endpoint="{endpoint}"}} {value:.6f}')
+            out.append('# HELP http_requests_total Requests by endpoint and status.')
+            out.append('# TYPE http_requests_total counter')
+            for (endpoint, status), value in sorted(self.requests.items()):
+                out.append(f'http_requests_total{{endpoint="{endpoint}",status="{status}"}} {value}')
+            out.append('# HELP db_slow_queries_total Statements slower than the slow-query threshold.')
+            out.append('# TYPE db_slow_queries_total counter')
+            for endpoint, value in sorted(self.slow_queries.items()):
+                out.append(f'db_slow_queries_total{{endpoint="{endpoint}"}} {value}')
+        return '\n'.join(out) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self.latency.clear()
+            self.queries.clear()
+            self.db_seconds.clear()
+            self.requests.clear()
+            self.slow_queries.clear()
+
+
+def _histogram(out, name, help_text, series):
+    out.append(f'# HELP {name} {help_text}')
+    out.append(f'# TYPE {name} histogram')
+    for endpoint, hist in sorted(series.items()):
+        for bound, count in zip(hist.buckets, hist.counts):
+            out.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+        out.append(f'{name}_bucket{{endpoint="{endpoint}",le="+Inf"}} {hist.total}')
+        out.append(f'{name}_sum{{endpoint="{endpoint}"}} {hist.sum:.6f}')
+        out.append(f'{name}_count{{endpoint="{endpoint}"}} {hist.total}')
+
+
+metrics = Metrics()
+
+
+def endpoint_name():
+    if not has_request_context():
+        return 'background'
+    return request.endpoint or 'unknown'
+
+
+def init_app(app):
+    slow_query = app.config['SLOW_QUERY_SECONDS']
+    slow_request = app.config['SLOW_REQUEST_SECONDS']
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start'].pop()
+        if has_request_context() and 'sql_queries' in g:
+            g.sql_queries += 1
+            g.sql_seconds += elapsed
+        if elapsed >= slow_query:
+            endpoint = endpoint_name()
+            metrics.record_slow_query(endpoint)
+            sql_log.warning("slow query endpoint=%s ms=%.1f sql=%s",
+                            endpoint, elapsed * 1000, normalize_sql(statement))
+
+    @event.listens_for(Engine, 'handle_error')
+    def _query_failed(context):
+        # after_cursor_execute tidak dipanggil saat error; buang start-nya
+        if context.connection is not None and context.connection.info.get('query_start'):
+            context.connection.info['query_start'].pop()
+
+    @app.before_request
+    def _start_timer():
+        g.request_start = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_seconds = 0.0
+
+    @app.after_request
+    def _record_request(response):
+        if 'request_start' not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_start
+        endpoint = endpoint_name()
+        metrics.record(endpoint, response.status_code, elapsed, g.sql_queries, g.sql_seconds)
+        level = logging.WARNING if elapsed >= slow_request else logging.DEBUG
+        if log.isEnabledFor(level):
+            log.log(level, "request endpoint=%s method=%s status=%s ms=%.1f queries=%d db_ms=%.1f",
+                    endpoint, request.method, response.status_code, elapsed * 1000,
+                    g.sql_queries, g.sql_seconds * 1000)
+        return response
@@ -0,0 +1,217 @@
+"""Batch inventory planning.
+
+Menghitung forecast (SES), ROP, EOQ dan status stok untuk semua produk
+sekaligus di atas array NumPy, bukan satu per satu di loop Python.
+Hasilnya harus identik dengan ``plan_product`` (versi per produk);
+``flask plan-check`` membandingkan keduanya pada data acak.
+``report_rows`` juga menerima ramalan dari model lain (lihat forecasting.py).
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from config import LEAD_TIME_DAYS, WORKING_DAYS, ORDER_COST, HOLDING_RATE
+
+STATUS_NEW, STATUS_EMPTY, STATUS_DANGER, STATUS_OVERSTOCK, STATUS_SAFE = range(5)
+
+# Kunci status untuk API / filter (?status=danger)
+STATUS_KEYS = {
+    'new': STATUS_NEW,
+    'empty': STATUS_EMPTY,
+    'danger': STATUS_DANGER,
+    'overstock': STATUS_OVERSTOCK,
+    'safe': STATUS_SAFE,
+}
+
+STATUS_LABELS = {
+    STATUS_NEW: ("Produk Baru", "Monitor Penjualan", "info"),
+    STATUS_EMPTY: ("Stok Kosong", "Input Stok Awal", "warning"),
+    STATUS_DANGER: ("Bahaya", None, "danger"),
+    STATUS_OVERSTOCK: ("Overstock", "Stop Order", "success"),
+    STATUS_SAFE: ("Aman", "-", "success"),
+}
+
+
+def history_matrix(histories):
+    """Pad a list of monthly qty histories into a (products x months) matrix.
+
+    Rows are left-aligned; ``lengths`` tells how many leading cells of each
+    row are real data.
+    """
+    lengths = np.fromiter((len(h) for h in histories), dtype=np.int64, count=len(histories))
+    width = int(lengths.max()) if len(histories) else 0
+    matrix = np.zeros((len(histories), max(width, 1)), dtype=np.float64)
+    for i, h in enumerate(histories):
+        if h:
+            matrix[i, :len(h)] = h
+    return matrix, lengths
+
+
+def ses_last(matrix, lengths, alpha=0.3):
+    """Last simple-exponential-smoothing level of every row.
+
+    Walks the month axis once and updates all products per step, using the
+    same operation order as ``exponential_smoothing`` so the floats match.
+    """
+    level = matrix[:, 0].copy()
+    for j in range(1, matrix.shape[1]):
+        active = lengths > j
+        level = np.where(active, alpha * matrix[:, j] + (1 - alpha) * level, level)
+    return level
+
+
+def plan_levels(level, has_data, prices, stocks):
+    """Plan from any model's raw next-month demand ``level`` per product."""
+    forecast = np.where(has_data, np.ceil(level), 0.0)
+
+    demand = forecast > 0
+    rop = np.where(demand, np.ceil(forecast / WORKING_DAYS * LEAD_TIME_DAYS), 0.0)
+
+    holding_cost = prices * HOLDING_RATE
+    ok = demand & (holding_cost > 0)
+    annual_demand = forecast * 12
+    ratio = np.divide(2 * annual_demand * ORDER_COST, holding_cost,
+                      out=np.zeros_like(forecast), where=ok)
+    eoq = np.where(ok, np.ceil(np.sqrt(ratio)), 0.0)
+
+    status = np.select(
+        [
+            ~has_data & (stocks > 0),
+            ~has_data,
+            stocks <= rop,
+            (stocks > rop + eoq * 2) & (eoq > 0),
+        ],
+        [STATUS_NEW, STATUS_EMPTY, STATUS_DANGER, STATUS_OVERSTOCK],
+        default=STATUS_SAFE,
+    )
+    return forecast.astype(np.int64), rop.astype(np.int64), eoq.astype(np.int64), status
+
+
+def plan_inventory(products, history, alpha=0.3):
+    """Build the inventory report rows for ``products`` in one batch.
+
+    ``products`` is any sequence of objects with id, name, sku, price and
+    stock; ``history`` maps product id to its monthly qty list (oldest first).
+    """
+    products = list(products)
+    if not products:
+        return []
+
+    matrix, lengths = history_matrix([history.get(p.id, []) for p in products])
+    return report_rows(products, ses_last(matrix, lengths, alpha), lengths > 0)
+
+
+def report_rows(products, level, has_data, models=None):
+    """Inventory report rows from a per-product forecast ``level`` array.
+
+    ``models`` optionally names the forecasting model used for each product.
+    """
+    prices = np.array([p.price or 0 for p in products], dtype=np.float64)
+    stocks = np.array([p.stock or 0 for p in products], dtype=np.float64)
+
+    forecast, rop, eoq, status = plan_levels(level, has_data, prices, stocks)
+
+    report = []
+    for i, p in enumerate(products):
+        code = int(status[i])
+        label, action, status_class = STATUS_LABELS[code]
+        if code == STATUS_DANGER:
+            buy_qty = int(eoq[i]) if eoq[i] > 0 else 10
+            action = f"ORDER {buy_qty} pcs"
+        row = {
+            'name': p.name,
+            'sku': p.sku,
+            'price': p.price,
+            'stock': p.stock,
+            'forecast': int(forecast[i]),
+            'rop': int(rop[i]),
+            'eoq': int(eoq[i]),
+            'status': label,
+            'status_code': code,
+            'action': action,
+            'status_class': status_class
+        }
+        if models is not None:
+            row['model'] = models[i]
+        report.append(row)
+    return report
+
+
+def plan_product(p, qty_history, alpha=0.3):
+    """Per-product reference implementation (the original reports() loop)."""
+    if len(qty_history) >= 2:
+        level = qty_history[0]
+        for x in qty_history[1:]:
+            level = alpha * x + (1 - alpha) * level
+        next_forecast = math.ceil(level)
+        has_data = True
+    elif len(qty_history) == 1:
+        next_forecast = math.ceil(qty_history[0])
+        has_data = True
+    else:
+        next_forecast = 0
+        has_data = False
+
+    rop = 0
+    eoq = 0
+    if next_forecast > 0:
+        daily_demand = next_forecast / WORKING_DAYS
+        annual_demand = next_forecast * 12
+        rop = math.ceil(daily_demand * LEAD_TIME_DAYS)
+
+        holding_cost = p.price * HOLDING_RATE
+        if holding_cost > 0:
+            eoq = math.ceil(math.sqrt((2 * annual_demand * ORDER_COST) / holding_cost))
+
+    stock = p.stock or 0
+    if not has_data:
+        code = STATUS_NEW if stock > 0 else STATUS_EMPTY
+    elif stock <= rop:
+        code = STATUS_DANGER
+    elif stock > (rop + (eoq * 2)) and eoq > 0:
+        code = STATUS_OVERSTOCK
+    else:
+        code = STATUS_SAFE
+
+    label, action, status_class = STATUS_LABELS[code]
+    if code == STATUS_DANGER:
+        action = f"ORDER {int(eoq) if eoq > 0 else 10} pcs"
+    return {
+        'name': p.name,
+        'sku': p.sku,
+        'price': p.price,
+        'stock': p.stock,
+        'forecast': next_forecast,
+        'rop': rop,
+        'eoq': eoq,
+        'status': label,
+        'status_code': code,
+        'action': action,
+        'status_class': status_class
+    }
+
+
+def check_equivalence(n, seed=1, alpha=0.3, max_months=36):
+    """Compare ``plan_inventory`` with ``plan_product`` on ``n`` random products.
+
+    Histories, prices and stocks are drawn around the ROP / EOQ boundaries
+    so every status occurs. Returns the ids of products whose rows differ.
+    """
+    rng = np.random.default_rng(seed)
+    Item = namedtuple('Item', ['id', 'name', 'sku', 'price', 'stock'])
+    products = []
+    history = {}
+    for pid in range(1, n + 1):
+        months = int(rng.integers(0, max_months + 1))
+        scale = float(rng.choice([0.4, 3, 30, 300]))
+        qty = rng.poisson(scale, size=months).astype(np.float64)
+        if months:
+            history[pid] = list(qty)
+        stock = int(rng.integers(0, 3 * (scale + 5))) if rng.random() < 0.9 else None
+        price = float(rng.choice([0, 15_000, 250_000, 2_500_000])) + float(rng.integers(0, 1000))
+        products.append(Item(pid, f"P{pid}", f"SKU{pid}", price, stock))
+
+    batch = plan_inventory(products, history, alpha=alpha)
+    return [p.id for p, row in zip(products, batch)
+            if plan_product(p, history.get(p.id, []), alpha=alpha) != row]
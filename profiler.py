@@ -0,0 +1,90 @@
+"""On-demand cProfile of single requests.
+
+A developer adds ``X-Profile: 1`` (or ``?_profile=1``) to a request; that
+request alone runs under cProfile and the stats are written to the
+profile folder as ``<time>-<endpoint>-<ms>ms-<id>.prof`` (pstats format;
+open with ``python -m pstats``, snakeviz, or convert for speedscope).
+Requests without the flag only pay for one header / query-string check.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import secrets
+from datetime import datetime
+
+HEADER = 'X-Profile'
+ARG = '_profile'
+NAME_RE = re.compile(r'^(\d{8}T\d{6})-([\w.]+)-(\d+)ms-([0-9a-f]{8})\.prof$')
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+def requested(request):
+    return bool(request.headers.get(HEADER)) or (
+        ARG.encode() in request.query_string and ARG in request.args)
+
+
+def start():
+    """Enabled profiler, or None if another profiler is already running."""
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        return None
+    return profile
+
+
+class ProfileStore:
+    """Folder of saved profiles, newest ``keep`` retained."""
+
+    def __init__(self, folder, keep=50):
+        self.folder = folder
+        self.keep = keep
+
+    def save(self, profile, endpoint, seconds):
+        profile.disable()
+        os.makedirs(self.folder, exist_ok=True)
+        name = (f"{datetime.utcnow():%Y%m%dT%H%M%S}-{endpoint or 'unknown'}-"
+                f"{int(seconds * 1000)}ms-{secrets.token_hex(4)}.prof")
+        profile.dump_stats(os.path.join(self.folder, name))
+        self.prune()
+        return name
+
+    def entries(self):
+        """Saved profiles, newest first, as dicts."""
+        try:
+            names = os.listdir(self.folder)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            match = NAME_RE.match(name)
+            if not match:
+                continue
+            stamp, endpoint, ms, _ = match.groups()
+            entries.append({
+                'name': name,
+                'created_at': datetime.strptime(stamp, '%Y%m%dT%H%M%S'),
+                'endpoint': endpoint,
+                'ms': int(ms),
+            })
+        entries.sort(key=lambda e: e['name'], reverse=True)
+        return entries
+
+    def prune(self):
+        for entry in self.entries()[self.keep:]:
+            try:
+                os.remove(os.path.join(self.folder, entry['name']))
+            except OSError:
+                pass
+
+    def exists(self, name):
+        return bool(NAME_RE.match(name)) and os.path.exists(os.path.join(self.folder, name))
+
+    def report(self, name, sort='cumulative', limit=60):
+        """Text table of the top ``limit`` functions of a saved profile."""
+        out = io.StringIO()
+        stats = pstats.Stats(os.path.join(self.folder, name), stream=out)
+        stats.strip_dirs().sort_stats(sort if sort in SORT_KEYS else 'cumulative').print_stats(limit)
+        return out.getvalue()
@@ -0,0 +1,39 @@
+"""Minimal in-process interval scheduler.
+
+Each job runs in its own daemon thread every ``seconds`` seconds. Errors
+are logged and the job keeps its schedule. With several worker processes
+every worker runs its own copy, so for multi-worker deployments prefer a
+cron entry calling the matching ``flask`` CLI command instead.
+"""
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class IntervalScheduler:
+
+    def __init__(self):
+        self._jobs = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def add_job(self, name, seconds, fn):
+        """Register ``fn()`` to run every ``seconds``; starts it if running."""
+        with self._lock:
+            if name in self._jobs:
+                return
+            thread = threading.Thread(target=self._loop, args=(name, seconds, fn),
+                                      name=f"scheduler-{name}", daemon=True)
+            self._jobs[name] = thread
+            thread.start()
+
+    def _loop(self, name, seconds, fn):
+        while not self._stop.wait(seconds):
+            try:
+                fn()
+            except Exception:
+                log.exception("job %s gagal", name)
+
+    def shutdown(self):
+        self._stop.set()
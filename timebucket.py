@@ -0,0 +1,128 @@
+"""Dialect-aware time bucketing for analytics queries.
+
+``time_bucket('month', Sale.created_at)`` compiles to ``DATE_FORMAT`` on
+MySQL/MariaDB, ``strftime`` on SQLite and ``to_char(date_trunc(...))`` on
+PostgreSQL, and always yields the same sortable string:
+
+    day    2025-03-07
+    week   2025-03-03   (Monday of the ISO week)
+    month  2025-03
+
+``bucket_key`` is the Python twin for values bucketed outside SQL. Range
+filters go through ``in_range`` so they compare the bare column and can use
+the ``created_at`` index.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import String, and_
+from sqlalchemy.exc import CompileError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+UNITS = ('day', 'week', 'month')
+
+
+class _TimeBucket(FunctionElement):
+    type = String()
+    inherit_cache = True
+    unit = None
+
+
+class _DayBucket(_TimeBucket):
+    name = 'time_bucket_day'
+    inherit_cache = True
+    unit = 'day'
+
+
+class _WeekBucket(_TimeBucket):
+    name = 'time_bucket_week'
+    inherit_cache = True
+    unit = 'week'
+
+
+class _MonthBucket(_TimeBucket):
+    name = 'time_bucket_month'
+    inherit_cache = True
+    unit = 'month'
+
+
+_BUCKETS = {'day': _DayBucket, 'week': _WeekBucket, 'month': _MonthBucket}
+
+
+def time_bucket(unit, expr):
+    """SQL expression bucketing datetime ``expr`` into ``unit`` strings."""
+    if unit not in _BUCKETS:
+        raise ValueError(f"unit harus salah satu dari {UNITS}")
+    return _BUCKETS[unit](expr)
+
+
+@compiles(_TimeBucket, 'mysql')
+@compiles(_TimeBucket, 'mariadb')
+def _mysql(element, compiler, **kw):
+    col = compiler.process(list(element.clauses)[0], **kw)
+    if element.unit == 'month':
+        return f"DATE_FORMAT({col}, '%%Y-%%m')"
+    if element.unit == 'week':
+        return f"DATE_FORMAT(DATE_SUB({col}, INTERVAL WEEKDAY({col}) DAY), '%%Y-%%m-%%d')"
+    return f"DATE_FORMAT({col}, '%%Y-%%m-%%d')"
+
+
+@compiles(_TimeBucket, 'sqlite')
+def _sqlite(element, compiler, **kw):
+    col = compiler.process(list(element.clauses)[0], **kw)
+    if element.unit == 'month':
+        return f"strftime('%Y-%m', {col})"
+    if element.unit == 'week':
+        # 'weekday 0' maju ke hari Minggu, -6 hari = Senin minggu itu
+        return f"date({col}, 'weekday 0', '-6 days')"
+    return f"strftime('%Y-%m-%d', {col})"
+
+
+@compiles(_TimeBucket, 'postgresql')
+def _postgresql(element, compiler, **kw):
+    col = compiler.process(list(element.clauses)[0], **kw)
+    fmt = 'YYYY-MM' if element.unit == 'month' else 'YYYY-MM-DD'
+    return f"to_char(date_trunc('{element.unit}', {col}), '{fmt}')"
+
+
+@compiles(_TimeBucket)
+def _default(element, compiler, **kw):
+    raise CompileError(
+        f"time_bucket belum didukung untuk dialect {compiler.dialect.name}")
+
+
+def bucket_key(value, unit):
+    """Python equivalent of ``time_bucket`` for a datetime / date."""
+    if unit == 'month':
+        return value.strftime('%Y-%m')
+    if unit == 'week':
+        day = value.date() if isinstance(value, datetime) else value
+        return (day - timedelta(days=day.weekday())).isoformat()
+    if unit == 'day':
+        return value.strftime('%Y-%m-%d')
+    raise ValueError(f"unit harus salah satu dari {UNITS}")
+
+
+def period_start(unit, periods_back=0, today=None):
+    """Start (as datetime) of the bucket ``periods_back`` buckets before today's."""
+    today = today or date.today()
+    if unit == 'day':
+        start = today - timedelta(days=periods_back)
+    elif unit == 'week':
+        start = today - timedelta(days=today.weekday(), weeks=periods_back)
+    elif unit == 'month':
+        months = today.year * 12 + today.month - 1 - periods_back
+        start = date(months // 12, months % 12 + 1, 1)
+    else:
+        raise ValueError(f"unit harus salah satu dari {UNITS}")
+    return datetime(start.year, start.month, start.day)
+
+
+def in_range(column, start=None, end=None):
+    """``start <= column < end`` on the bare column (index friendly)."""
+    clauses = []
+    if start is not None:
+        clauses.append(column >= start)
+    if end is not None:
+        clauses.append(column < end)
+    return and_(*clauses) if clauses else and_(True)